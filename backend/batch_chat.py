@@ -0,0 +1,137 @@
+"""
+Batch question answering / offline evaluation client for /chat/batch.
+
+Reads prompts from a file (one per line, or JSONL with a "prompt" or "message"
+field), sends them to a running API in batches and writes the answers as NDJSON,
+one line per prompt as they complete, tagged with their line index in the input.
+
+Usage:
+    python batch_chat.py <prompts.txt|prompts.jsonl> --email you@example.com --password ...
+                         [--base-url http://127.0.0.1:8002] [--model llama-3.3-70b-versatile]
+                         [--system-prompt TEXT] [--cascade] [--concurrency 4]
+                         [--batch-size 500] [--output answers.ndjson]
+
+--token (or BATCH_CHAT_TOKEN) can be given instead of --email/--password.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import httpx
+
+
+def load_prompts(path):
+    """Returns the prompts in a .txt (one per line) or .jsonl ("prompt"/"message" field) file."""
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                prompts.append(record.get("prompt") or record["message"])
+            else:
+                prompts.append(line)
+    return prompts
+
+
+def login(client, email, password):
+    response = client.post("/auth/token", data={"username": email, "password": password})
+    if response.status_code != 200:
+        print(f"Login failed ({response.status_code}): {response.text}")
+        sys.exit(1)
+    return response.json()["access_token"]
+
+
+def run_batches(client, token, prompts, options, batch_size, out):
+    """
+    Posts prompts to /chat/batch batch_size at a time and writes every result line to out.
+
+    Output:
+        dict: Run summary (prompts, errors, conversations, seconds).
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    start = time.time()
+    errors = 0
+    conversations = []
+
+    for offset in range(0, len(prompts), batch_size):
+        batch = prompts[offset:offset + batch_size]
+        payload = {"prompts": batch, **options}
+        with client.stream("POST", "/chat/batch", json=payload, headers=headers) as response:
+            if response.status_code != 200:
+                response.read()
+                print(f"Batch at {offset} failed ({response.status_code}): {response.text}")
+                errors += len(batch)
+                continue
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                result = json.loads(line)
+                if result.get("done"):
+                    conversations.append(result["conversation_id"])
+                    continue
+                result["index"] += offset # Position in the input file, not the batch
+                if "error" in result:
+                    errors += 1
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+        print(f"Answered {min(offset + batch_size, len(prompts))}/{len(prompts)} prompts ({time.time() - start:.0f}s)", file=sys.stderr)
+
+    return {
+        "prompts": len(prompts),
+        "errors": errors,
+        "conversations": conversations,
+        "seconds": round(time.time() - start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of prompts through the /chat/batch endpoint.")
+    parser.add_argument("path", help="Prompts file: .txt (one per line) or .jsonl")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8002")
+    parser.add_argument("--email", default=os.getenv("BATCH_CHAT_EMAIL"))
+    parser.add_argument("--password", default=os.getenv("BATCH_CHAT_PASSWORD"))
+    parser.add_argument("--token", default=os.getenv("BATCH_CHAT_TOKEN"), help="Bearer token instead of email/password")
+    parser.add_argument("--model", default="llama-3.3-70b-versatile")
+    parser.add_argument("--system-prompt", default=None)
+    parser.add_argument("--cascade", action="store_true", help="Try the small model first (see utils/model_cascade.py)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Generations in flight at once")
+    parser.add_argument("--batch-size", type=int, default=500, help="Prompts per request (server max BATCH_MAX_PROMPTS)")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for the next result line")
+    parser.add_argument("--output", help="Write NDJSON results here instead of stdout")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"File not found: {args.path}")
+        sys.exit(1)
+    prompts = load_prompts(args.path)
+    if not prompts:
+        print("No prompts found")
+        sys.exit(1)
+
+    options = {"model": args.model, "system_prompt": args.system_prompt, "cascade": args.cascade, "concurrency": args.concurrency}
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with httpx.Client(base_url=args.base_url, timeout=args.timeout) as client:
+            if args.token:
+                token = args.token
+            elif args.email and args.password:
+                token = login(client, args.email, args.password)
+            else:
+                print("Give --token or --email and --password")
+                sys.exit(1)
+            summary = run_batches(client, token, prompts, options, args.batch_size, out)
+    finally:
+        if args.output:
+            out.close()
+
+    print(f"Answered {summary['prompts'] - summary['errors']}/{summary['prompts']} prompts in {summary['seconds']}s "
+          f"(conversations: {', '.join(summary['conversations']) or 'none'})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
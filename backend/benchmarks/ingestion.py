@@ -0,0 +1,281 @@
+"""
+Ingestion throughput benchmark.
+
+Generates synthetic PDF, DOCX, XLSX and TXT files of controlled sizes, runs them through
+the same path as /documents/upload (parse -> split -> embed -> index) and times each stage.
+Results are printed as JSON (pages/sec, chunks/sec, peak RSS per file type and size).
+Each file type and size runs in its own fresh process, so its peak RSS isn't inflated
+by the cases that ran before it.
+
+Runs fully offline by default using deterministic fake embeddings; pass --embeddings model
+to benchmark the real HuggingFace model (must already be in the local cache). If the cl100k
+tokenizer isn't cached either, chunk sizes come from the length estimate
+(TOKENIZER_ALLOW_ESTIMATE defaults to 1 here); the report's "tokenizer" field says which was
+used, since the two produce different chunk counts.
+
+Usage (from backend/):
+    python -m benchmarks.ingestion [--pages 1 10 50] [--types pdf docx xlsx txt] [--repeat 3]
+                                   [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+from docx import Document as DocxDocument
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+# Before any utils import: text_utils reads it at import time (and spawned workers inherit it)
+os.environ.setdefault("TOKENIZER_ALLOW_ESTIMATE", "1")
+
+from bulk_index import LocalFile
+from utils.document_processor import load_documents, split_documents
+from utils.text_utils import get_tokenizer, TOKENIZER_ENCODING
+from utils.vector_store_manager import VectorStoreManager
+
+CHARS_PER_PAGE = 3000
+ROWS_PER_PAGE = 40
+FAKE_EMBEDDING_SIZE = 384 # Same dimension as all-MiniLM-L6-v2
+
+WORDS = (
+    "retrieval augmented generation vector index embedding chunk document query answer "
+    "context model latency throughput token page section table report analysis system "
+    "network storage cache memory worker request response policy budget summary result"
+).split()
+
+
+def synthetic_text(n_chars, rng):
+    words = []
+    length = 0
+    while length < n_chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def make_txt(pages, rng):
+    return "\n\n".join(synthetic_text(CHARS_PER_PAGE, rng) for _ in range(pages)).encode("utf-8")
+
+
+def make_docx(pages, rng):
+    doc = DocxDocument()
+    for _ in range(pages):
+        for _ in range(5):
+            doc.add_paragraph(synthetic_text(CHARS_PER_PAGE // 5, rng))
+        doc.add_page_break()
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def make_xlsx(pages, rng):
+    rows = pages * ROWS_PER_PAGE
+    df = pd.DataFrame({
+        "id": range(rows),
+        "name": [rng.choice(WORDS) for _ in range(rows)],
+        "value": [rng.random() * 1000 for _ in range(rows)],
+        "notes": [synthetic_text(40, rng) for _ in range(rows)],
+    })
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def make_pdf(pages, rng):
+    """Writes a minimal multi-page PDF with one text block per page (no PDF library needed)."""
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(None) # 1: catalog, filled in below
+    objects.append(None) # 2: page tree, filled in below
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for _ in range(pages):
+        text = synthetic_text(CHARS_PER_PAGE, rng)
+        lines = [text[i:i + 90] for i in range(0, len(text), 90)]
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        ops += [f"({line}) '" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id)
+        )
+        page_ids.append(len(objects))
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+GENERATORS = {
+    "pdf": make_pdf,
+    "docx": make_docx,
+    "xlsx": make_xlsx,
+    "txt": make_txt,
+}
+
+
+def peak_rss_mb():
+    # Peak for the whole process (ru_maxrss is reported in KB on Linux)
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_once(uploaded, embeddings):
+    """Runs one file through parse -> split -> embed -> index and returns per-stage timings."""
+    timings = {}
+
+    t = time.perf_counter()
+    documents = load_documents(uploaded)
+    timings["parse"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    chunks = split_documents(documents, uploaded.name)
+    timings["split"] = time.perf_counter() - t
+
+    texts = [c.page_content for c in chunks]
+    t = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    timings["embed"] = time.perf_counter() - t
+
+    manager = VectorStoreManager()
+    manager.embeddings = embeddings
+    t = time.perf_counter()
+    manager.add_embeddings(texts, vectors, [c.metadata for c in chunks])
+    timings["index"] = time.perf_counter() - t
+
+    return len(documents), len(chunks), timings
+
+
+def make_embeddings(kind):
+    if kind == "fake":
+        return DeterministicFakeEmbedding(size=FAKE_EMBEDDING_SIZE)
+    return VectorStoreManager().get_embeddings()
+
+
+def run_case(file_type, pages, repeat, embeddings_kind, seed=0):
+    """Benchmarks one file type and size. Runs in a fresh worker process (see benchmark())."""
+    embeddings = make_embeddings(embeddings_kind)
+    rng = random.Random(seed)
+    data = GENERATORS[file_type](pages, rng)
+    uploaded = LocalFile(f"synthetic_{pages}p.{file_type}", data)
+    start_rss = peak_rss_mb()
+
+    runs = [run_once(uploaded, embeddings) for _ in range(repeat)]
+    parsed_pages, chunk_count, _ = runs[0]
+    stages = {
+        stage: round(statistics.median(r[2][stage] for r in runs), 4)
+        for stage in ("parse", "split", "embed", "index")
+    }
+    total = sum(stages.values()) or 1e-9
+
+    return {
+        "type": file_type,
+        "pages": pages,
+        "bytes": len(data),
+        "parsed_pages": parsed_pages,
+        "chunks": chunk_count,
+        "stage_seconds": stages,
+        "total_seconds": round(total, 4),
+        "pages_per_sec": round(pages / total, 2),
+        "chunks_per_sec": round(chunk_count / total, 2),
+        "start_rss_mb": start_rss, # Worker after imports, embedding model and file generation
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def benchmark(file_types, page_counts, repeat, embeddings_kind, seed=0):
+    results = []
+    for file_type in file_types:
+        for pages in page_counts:
+            # A new process per case: ru_maxrss only ever grows, so a shared process would
+            # report the largest case so far rather than this one
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(run_case, file_type, pages, repeat, embeddings_kind, seed).result()
+            results.append(result)
+            print(f"{file_type:>5} {pages:>4}p: {result['chunks']} chunks in {result['total_seconds']:.3f}s, "
+                  f"peak RSS {result['peak_rss_mb']} MB", file=sys.stderr)
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns a list of regressions where chunks/sec dropped by more than tolerance."""
+    previous = {(r["type"], r["pages"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        base = previous.get((r["type"], r["pages"]))
+        if not base:
+            continue
+        floor = base["chunks_per_sec"] * (1 - tolerance)
+        if r["chunks_per_sec"] < floor:
+            regressions.append(
+                f"{r['type']} {r['pages']}p: {r['chunks_per_sec']} chunks/sec < {floor:.2f} (baseline {base['chunks_per_sec']})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the document ingestion path on synthetic files.")
+    parser.add_argument("--types", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--pages", nargs="+", type=int, default=[1, 10, 50], help="Synthetic file sizes, in pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file (median is reported)")
+    parser.add_argument("--embeddings", choices=["fake", "model"], default="fake",
+                        help="'fake' is offline and deterministic; 'model' uses the real embedding model")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", help="Previous results JSON; exit non-zero on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed chunks/sec drop vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report = {
+        "embeddings": args.embeddings,
+        "tokenizer": TOKENIZER_ENCODING if get_tokenizer() is not None else "estimate",
+        "repeat": args.repeat,
+        "results": benchmark(args.types, args.pages, args.repeat, args.embeddings),
+    }
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("tokenizer", report["tokenizer"]) != report["tokenizer"]:
+            print(f"Note: baseline was chunked with tokenizer '{baseline['tokenizer']}', "
+                  f"this run with '{report['tokenizer']}'", file=sys.stderr)
+        regressions = compare_to_baseline(report["results"], baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Load-test harness for the FastAPI app.
+
+Drives mixed traffic from authenticated virtual users against a running server
+and reports throughput and p50/p95/p99 latency per endpoint, plus the share of
+chat turns answered from the response cache:
+    POST /auth/token        login
+    POST /chat/             chat turn (new or continued conversation)
+    GET  /chat/history      conversation list
+    POST /documents/upload  small text document
+
+Run the app against the mock upstreams so no API quota is used:
+    python -m benchmarks.mock_upstreams --port 8900 &
+    USE_MOCK_UPSTREAMS=1 GROQ_API_KEY=mock uvicorn main:app --port 8002 &
+
+Usage (from backend/):
+    python -m benchmarks.loadtest [--base-url http://127.0.0.1:8002] [--users 20] [--duration 60]
+                                  [--mix chat=0.6,history=0.25,upload=0.1,token=0.05] [--repeat-ratio 0.2]
+                                  [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+
+Chat prompts are unique (cache-busting) except for a --repeat-ratio share drawn
+from a few popular questions, so latency reflects real generations rather than
+cache hits; --repeat-ratio 1 replays only the popular set.
+
+Test users (loadtest-N@example.com) are seeded straight into data/users.db unless
+--no-seed is given, so the server must share this checkout's data directory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+import httpx
+
+from utils.security import get_password_hash
+
+USERS_DB = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "users.db"))
+USER_PASSWORD = "loadtest-password"
+DEFAULT_MIX = "chat=0.6,history=0.25,upload=0.1,token=0.05"
+
+# Popular questions, asked repeatedly (the cacheable share of traffic)
+QUESTIONS = [
+    "What are the main points of the uploaded report?",
+    "Summarise the latest results in two sentences.",
+    "How does retrieval augmented generation work?",
+    "Write a Python function that reverses a linked list.",
+    "What did we discuss earlier about caching?",
+    "Explain the difference between latency and throughput.",
+]
+
+# Building blocks for unique prompts
+PROMPT_TEMPLATES = [
+    "What does the uploaded report say about {topic}?",
+    "Summarise what we know about {topic} in {n} sentences.",
+    "Explain {topic} to a new team member.",
+    "List {n} risks related to {topic} and how to mitigate them.",
+    "Write a Python function that helps with {topic}.",
+    "Compare {topic} with the approach we discussed earlier.",
+]
+PROMPT_TOPICS = [
+    "quarterly revenue", "cache invalidation", "vector search", "rate limiting", "database indexing",
+    "document ingestion", "prompt budgeting", "circuit breakers", "load balancing", "model cascades",
+    "web search ranking", "conversation summaries", "connection pooling", "request deadlines",
+]
+DEFAULT_REPEAT_RATIO = 0.2
+
+WORDS = (
+    "quarterly revenue grew while latency dropped after the cache rollout and the team "
+    "moved indexing offline so uploads return faster during peak traffic"
+).split()
+
+
+def make_prompt(rng, repeat_ratio):
+    """A popular question with probability repeat_ratio, otherwise a prompt no earlier turn has used."""
+    if rng.random() < repeat_ratio:
+        return rng.choice(QUESTIONS)
+    prompt = rng.choice(PROMPT_TEMPLATES).format(topic=rng.choice(PROMPT_TOPICS), n=rng.randint(2, 6))
+    # Unique tag, so template/topic collisions don't turn into cache hits
+    return f"{prompt} (ref {rng.getrandbits(48):012x})"
+
+
+def seed_users(count):
+    """Creates (or resets) the load-test accounts directly in users.db."""
+    password_hash = get_password_hash(USER_PASSWORD)
+    conn = sqlite3.connect(USERS_DB)
+    conn.executemany(
+        "INSERT OR REPLACE INTO users (email, password, full_name, is_verified) VALUES (?, ?, ?, 1)",
+        [(f"loadtest-{i}@example.com", password_hash, f"Load Test {i}") for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def parse_mix(text):
+    """'chat=0.6,history=0.4' -> {'chat': 0.6, 'history': 0.4}"""
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"chat", "history", "upload", "token"}
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {sorted(unknown)}")
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Collects latency samples and status codes per endpoint."""
+    def __init__(self):
+        self.samples = {}
+        self.chat_answers = 0
+        self.chat_cached = 0
+
+    def record(self, endpoint, seconds, status):
+        self.samples.setdefault(endpoint, []).append((seconds, status))
+
+    def record_chat(self, cached):
+        self.chat_answers += 1
+        self.chat_cached += 1 if cached else 0
+
+    def cache_hit_ratio(self):
+        """Share of successful chat turns served from the response cache."""
+        if not self.chat_answers:
+            return None
+        return round(self.chat_cached / self.chat_answers, 4)
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = sorted(s for s, _ in samples)
+            errors = sum(1 for _, status in samples if status >= 400 or status == 0)
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": round(errors / len(samples), 4),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+                "statuses": {str(code): sum(1 for _, s in samples if s == code) for code in sorted({s for _, s in samples})},
+            }
+        return endpoints
+
+
+async def timed(recorder, endpoint, request):
+    """Awaits an HTTP request, recording its latency and status (0 for transport errors)."""
+    start = time.perf_counter()
+    try:
+        response = await request
+        status = response.status_code
+    except httpx.HTTPError:
+        response, status = None, 0
+    recorder.record(endpoint, time.perf_counter() - start, status)
+    return response
+
+
+async def login(client, recorder, email):
+    response = await timed(recorder, "POST /auth/token", client.post(
+        "/auth/token", data={"username": email, "password": USER_PASSWORD}
+    ))
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def virtual_user(client, recorder, index, mix, stop_at, think_seconds, repeat_ratio):
+    """One authenticated user issuing a weighted random mix of requests until stop_at."""
+    rng = random.Random(index)
+    email = f"loadtest-{index}@example.com"
+    headers = await login(client, recorder, email)
+    if headers is None:
+        return
+    conversation_id = None
+    names, weights = zip(*mix.items())
+
+    while time.monotonic() < stop_at:
+        action = rng.choices(names, weights)[0]
+        if action == "chat":
+            payload = {"message": make_prompt(rng, repeat_ratio)}
+            # Half the turns continue the user's conversation (history + summary paths)
+            if conversation_id and rng.random() < 0.5:
+                payload["conversation_id"] = conversation_id
+            response = await timed(recorder, "POST /chat/", client.post("/chat/", json=payload, headers=headers))
+            if response is not None and response.status_code == 200:
+                body = response.json()
+                conversation_id = body.get("conversation_id")
+                recorder.record_chat(body.get("cached", False))
+        elif action == "history":
+            await timed(recorder, "GET /chat/history", client.get("/chat/history", headers=headers))
+        elif action == "upload":
+            text = " ".join(rng.choice(WORDS) for _ in range(400))
+            files = {"file": (f"loadtest-{index}-{rng.randrange(10**6)}.txt", text.encode("utf-8"), "text/plain")}
+            await timed(recorder, "POST /documents/upload", client.post("/documents/upload", files=files, headers=headers))
+        elif action == "token":
+            headers = await login(client, recorder, email) or headers
+
+        if think_seconds:
+            await asyncio.sleep(rng.expovariate(1 / think_seconds))
+
+
+async def run_load(base_url, users, duration, mix, think_seconds, timeout, repeat_ratio):
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.monotonic()
+        stop_at = started + duration
+        await asyncio.gather(*(
+            virtual_user(client, recorder, i, mix, stop_at, think_seconds, repeat_ratio) for i in range(users)
+        ))
+        elapsed = time.monotonic() - started
+    return recorder.summary(elapsed), recorder.cache_hit_ratio(), elapsed
+
+
+def compare_to_baseline(endpoints, baseline, tolerance):
+    """
+    Returns regressions against a previous run: p95 latency up, throughput down by more
+    than tolerance, or error rate up by more than one percentage point.
+    """
+    regressions = []
+    for endpoint, base in baseline.get("endpoints", {}).items():
+        current = endpoints.get(endpoint)
+        if current is None:
+            regressions.append(f"{endpoint}: no requests in this run")
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {current['p95_ms']}ms > {base['p95_ms'] * (1 + tolerance):.1f}ms (baseline {base['p95_ms']}ms)")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{endpoint}: {current['throughput_rps']} req/s < {base['throughput_rps'] * (1 - tolerance):.2f} (baseline {base['throughput_rps']})")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{endpoint}: error rate {current['error_rate']:.2%} (baseline {base['error_rate']:.2%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive mixed authenticated traffic against the API and report latency percentiles.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8002")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. chat=0.6,history=0.4")
+    parser.add_argument("--repeat-ratio", type=float, default=DEFAULT_REPEAT_RATIO,
+                        help="Share of chat turns asking a popular (cacheable) question; the rest are unique")
+    parser.add_argument("--think-ms", type=float, default=100, help="Mean pause between a user's requests")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request client timeout (seconds)")
+    parser.add_argument("--no-seed", action="store_true", help="Don't create the load-test users in data/users.db")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", help="Previous results JSON; exit non-zero on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95/throughput change vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    if not args.no_seed:
+        seed_users(args.users)
+
+    print(f"Running {args.users} users for {args.duration:.0f}s against {args.base_url} ({args.mix})", file=sys.stderr)
+    endpoints, cache_hit_ratio, elapsed = asyncio.run(run_load(
+        args.base_url, args.users, args.duration, mix, args.think_ms / 1000, args.timeout, args.repeat_ratio
+    ))
+
+    total = sum(e["requests"] for e in endpoints.values())
+    report = {
+        "base_url": args.base_url,
+        "users": args.users,
+        "duration_seconds": round(elapsed, 2),
+        "mix": mix,
+        "repeat_ratio": args.repeat_ratio,
+        "chat_cache_hit_ratio": cache_hit_ratio,
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+    for endpoint, stats in endpoints.items():
+        print(f"{endpoint:<24} {stats['requests']:>6} req  {stats['throughput_rps']:>7} req/s  "
+              f"p50 {stats['p50_ms']:>8}ms  p95 {stats['p95_ms']:>8}ms  p99 {stats['p99_ms']:>8}ms  "
+              f"errors {stats['error_rate']:.1%}", file=sys.stderr)
+    if cache_hit_ratio is not None:
+        print(f"Chat cache hit ratio: {cache_hit_ratio:.1%} (repeat ratio {args.repeat_ratio:.0%})", file=sys.stderr)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("repeat_ratio", 1.0) != args.repeat_ratio:
+            # Older baselines only replayed the popular questions (repeat ratio 1)
+            print(f"Note: baseline used --repeat-ratio {baseline.get('repeat_ratio', 1.0)}, so its latencies "
+                  f"reflect a different cache hit ratio", file=sys.stderr)
+        regressions = compare_to_baseline(endpoints, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Offline stand-ins for the Groq and Tavily APIs, for load and performance testing.
+
+One server exposes both:
+    POST /openai/v1/chat/completions   OpenAI-compatible chat completions (Groq), incl. stream=true
+    POST /search                       Tavily-compatible web search
+    GET  /mock/config                  Current behaviour
+    POST /mock/config                  Change behaviour at runtime (e.g. start an "incident" mid-test)
+
+Behaviour is configurable: time-to-first-token latency distribution, token rate,
+completion length, injected 5xx errors and 429s, and an optional requests-per-minute
+limit enforced like the real provider (429 + Retry-After + x-ratelimit-* headers).
+
+Point the app at it with USE_MOCK_UPSTREAMS=1 (see utils/upstream_clients.py).
+
+Usage (from backend/):
+    python -m benchmarks.mock_upstreams [--port 8900] [--latency-ms 300] [--latency-dist lognormal]
+                                        [--tokens-per-sec 250] [--completion-tokens 200]
+                                        [--error-rate 0.0] [--rate-limit-rate 0.0] [--rpm 0]
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_CONFIG = {
+    "latency_ms": 300.0,         # Mean time to first token
+    "latency_dist": "lognormal", # fixed | uniform | normal | lognormal
+    "latency_spread": 0.5,       # Relative spread (uniform/normal) or sigma (lognormal)
+    "tokens_per_sec": 250.0,     # Generation speed after the first token
+    "completion_tokens": 200,    # Length of generated answers
+    "error_rate": 0.0,           # Fraction of requests answered with a 500
+    "rate_limit_rate": 0.0,      # Fraction of requests answered with a 429
+    "retry_after": 1.0,          # Seconds advertised on injected 429s
+    "rpm": 0,                    # Enforced requests per minute (0 = unlimited)
+    "tpm": 0,                    # Reported tokens-per-minute limit in headers (0 = unlimited)
+    "search_results": 5,         # Tavily results per query
+    "search_latency_ms": 400.0,  # Mean Tavily latency
+}
+
+WORDS = (
+    "the answer depends on context retrieved from documents and the web so this response "
+    "summarises the relevant points explains the reasoning and cites sources where possible"
+).split()
+
+config = dict(DEFAULT_CONFIG)
+stats = {"chat": 0, "search": 0, "errors": 0, "rate_limited": 0}
+
+_window_lock = threading.Lock()
+_window = [] # Request timestamps in the last minute, for the rpm limit
+
+app = FastAPI(title="Mock upstreams (Groq + Tavily)")
+
+def sample_latency(mean_ms):
+    """Draws a latency in seconds from the configured distribution."""
+    mean = mean_ms / 1000.0
+    spread = config["latency_spread"]
+    dist = config["latency_dist"]
+    if dist == "fixed" or mean <= 0:
+        return max(mean, 0.0)
+    if dist == "uniform":
+        return random.uniform(mean * (1 - spread), mean * (1 + spread))
+    if dist == "normal":
+        return max(0.0, random.gauss(mean, mean * spread))
+    # lognormal with the requested mean: heavy right tail like real providers
+    mu = math.log(mean) - spread ** 2 / 2
+    return random.lognormvariate(mu, spread)
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+def rate_limit_headers(remaining_requests):
+    headers = {
+        "x-ratelimit-limit-requests": str(config["rpm"] or 14400),
+        "x-ratelimit-remaining-requests": str(remaining_requests),
+        "x-ratelimit-reset-requests": "60s",
+    }
+    if config["tpm"]:
+        headers["x-ratelimit-limit-tokens"] = str(config["tpm"])
+        headers["x-ratelimit-remaining-tokens"] = str(config["tpm"])
+        headers["x-ratelimit-reset-tokens"] = "1s"
+    return headers
+
+def admit():
+    """
+    Applies the rpm limit and fault injection.
+
+    Returns:
+        tuple: (error_response or None, rate-limit headers)
+    """
+    now = time.monotonic()
+    with _window_lock:
+        while _window and now - _window[0] > 60:
+            _window.pop(0)
+        limit = config["rpm"]
+        if limit and len(_window) >= limit:
+            reset = 60 - (now - _window[0])
+            stats["rate_limited"] += 1
+            headers = {**rate_limit_headers(0), "retry-after": f"{reset:.2f}", "x-ratelimit-reset-requests": f"{reset:.2f}s"}
+            return JSONResponse({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}, status_code=429, headers=headers), headers
+        _window.append(now)
+        remaining = (limit - len(_window)) if limit else 14400
+    headers = rate_limit_headers(remaining)
+
+    roll = random.random()
+    if roll < config["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        headers = {**headers, "retry-after": str(config["retry_after"])}
+        return JSONResponse({"error": {"message": "Rate limit reached (injected)", "code": "rate_limit_exceeded"}}, status_code=429, headers=headers), headers
+    if roll < config["rate_limit_rate"] + config["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Internal server error (injected)"}}, status_code=500, headers=headers), headers
+    return None, headers
+
+def generate_answer(messages):
+    """Deterministic-length answer; router prompts (asking for the decision JSON) get valid JSON."""
+    prompt = messages[-1].get("content", "") if messages else ""
+    if "refined_query" in prompt and "strategy" in prompt:
+        query = prompt.split("Query:", 1)[-1].split("\n", 1)[0].strip()
+        return json.dumps({
+            "strategy": "Direct LLM",
+            "reasoning": "Mock router decision.",
+            "refined_query": query,
+            "context_source": "general_knowledge",
+            "confidence_score": 7,
+            "clarification_needed": False
+        })
+    count = config["completion_tokens"]
+    return " ".join(WORDS[i % len(WORDS)] for i in range(count))
+
+def usage_for(messages, completion):
+    prompt_tokens = sum(count_tokens(m.get("content", "")) for m in messages)
+    completion_tokens = count_tokens(completion)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["chat"] += 1
+    error, headers = admit()
+    if error is not None:
+        return error
+
+    messages = body.get("messages", [])
+    model = body.get("model", "mock-model")
+    answer = generate_answer(messages)
+    usage = usage_for(messages, answer)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    first_token_delay = sample_latency(config["latency_ms"])
+    token_delay = 1.0 / config["tokens_per_sec"] if config["tokens_per_sec"] > 0 else 0.0
+
+    if not body.get("stream"):
+        await asyncio.sleep(first_token_delay + usage["completion_tokens"] * token_delay)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": usage,
+        }, headers=headers)
+
+    async def stream():
+        await asyncio.sleep(first_token_delay)
+        pieces = answer.split(" ")
+        for i, piece in enumerate(pieces):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece if i == 0 else " " + piece}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            if token_delay:
+                await asyncio.sleep(token_delay)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": completion_id, "usage": usage},
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+@app.post("/search")
+async def search(request: Request):
+    body = await request.json()
+    stats["search"] += 1
+    error, headers = admit()
+    if error is not None:
+        return error
+
+    started = time.monotonic()
+    await asyncio.sleep(sample_latency(config["search_latency_ms"]))
+    query = body.get("query", "")
+    count = min(int(body.get("max_results", config["search_results"])), config["search_results"])
+    domains = body.get("include_domains") or ["example.com"]
+    results = [
+        {
+            "title": f"Result {i + 1} for {query}",
+            "url": f"https://{domains[i % len(domains)]}/mock/{i + 1}",
+            "content": f"Mock content about {query}. " + " ".join(WORDS),
+            "score": round(1.0 - i * 0.1, 2),
+        }
+        for i in range(count)
+    ]
+    return JSONResponse({
+        "query": query,
+        "answer": None,
+        "results": results,
+        "response_time": round(time.monotonic() - started, 3),
+    }, headers=headers)
+
+@app.get("/mock/config")
+def get_config():
+    return {"config": config, "stats": stats}
+
+@app.post("/mock/config")
+async def update_config(request: Request):
+    """Updates any subset of the config keys, e.g. {"error_rate": 0.5} to simulate an incident."""
+    changes = await request.json()
+    unknown = set(changes) - set(DEFAULT_CONFIG)
+    if unknown:
+        return JSONResponse({"detail": f"Unknown config keys: {sorted(unknown)}"}, status_code=400)
+    for key, value in changes.items():
+        config[key] = type(DEFAULT_CONFIG[key])(value)
+    return {"config": config}
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run mock Groq and Tavily servers for offline load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    config.update({key: getattr(args, key) for key in DEFAULT_CONFIG})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Offline bulk indexer.
+
+Walks a directory or a .zip archive, parses every supported file in parallel with the
+same loaders used by /documents/upload, embeds the chunks in large batches and writes
+a FAISS index to data/faiss_index. The API picks this index up on startup (see state.py).
+
+Usage:
+    python bulk_index.py <directory-or-zip> [--workers N] [--batch-size N] [--output DIR] [--append]
+                         [--allow-token-estimate]
+
+Chunks are sized in cl100k tokens, so the tokenizer must be loadable (cached in
+tokenizer_cache, or network access). --allow-token-estimate indexes offline with
+length-estimated chunk sizes instead.
+"""
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.document_processor import process_uploaded_file, SUPPORTED_EXTENSIONS
+from utils.vector_store_manager import VectorStoreManager, INDEX_DIR
+from utils import text_utils
+
+
+class LocalFile:
+    """Duck-typed stand-in for an uploaded file (.name and .getvalue()), as process_uploaded_file expects."""
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
+
+    def getvalue(self):
+        return self._data
+
+
+def iter_sources(path):
+    """
+    Yields (container, member) pairs for every supported file under path.
+    For a directory, container is None and member is the file path.
+    For a zip archive, container is the archive path and member is the entry name.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if os.path.splitext(member)[1].lower() in SUPPORTED_EXTENSIONS:
+                    yield (path, member)
+        return
+
+    for root, _, files in os.walk(path):
+        for filename in sorted(files):
+            if os.path.splitext(filename)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield (None, os.path.join(root, filename))
+
+
+# Zip archives open in this worker process. Opening one parses its whole central
+# directory, so each worker does that once per archive rather than once per member.
+_archives = {}
+
+
+def open_archive(path):
+    archive = _archives.get(path)
+    if archive is None:
+        archive = zipfile.ZipFile(path)
+        _archives[path] = archive
+    return archive
+
+
+def parse_source(source):
+    """
+    Worker: reads one file (from disk or from inside a zip) and returns its chunks.
+    Errors are returned rather than raised so one bad file doesn't stop the run.
+    """
+    container, member = source
+    try:
+        if container:
+            data = open_archive(container).read(member)
+        else:
+            with open(member, "rb") as f:
+                data = f.read()
+        return member, process_uploaded_file(LocalFile(os.path.basename(member), data)), None
+    except Exception as e:
+        return member, [], str(e)
+
+
+def bulk_index(path, workers=None, batch_size=512, output=INDEX_DIR, append=False):
+    """
+    Parses, embeds and indexes every supported file under path.
+
+    Input:
+        path (str): Directory or zip archive to index.
+        workers (int): Parser processes (defaults to CPU count).
+        batch_size (int): Chunks embedded per embedding call.
+        output (str): Directory to write the FAISS index to.
+        append (bool): Extend an existing index at output instead of replacing it.
+
+    Output:
+        dict: Run summary (files, chunks, failures, seconds).
+    """
+    manager = VectorStoreManager()
+    if append:
+        manager.load_local(output)
+    embeddings = manager.get_embeddings()
+
+    start = time.time()
+    files_done = 0
+    failures = []
+    total_chunks = 0
+    pending_texts, pending_metas = [], []
+
+    def flush():
+        nonlocal total_chunks
+        if not pending_texts:
+            return
+        vectors = embeddings.embed_documents(pending_texts)
+        manager.add_embeddings(pending_texts, vectors, pending_metas)
+        total_chunks += len(pending_texts)
+        pending_texts.clear()
+        pending_metas.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for member, docs, error in executor.map(parse_source, iter_sources(path), chunksize=16):
+            files_done += 1
+            if error:
+                failures.append((member, error))
+            for doc in docs:
+                pending_texts.append(doc.page_content)
+                pending_metas.append(doc.metadata)
+            if len(pending_texts) >= batch_size:
+                flush()
+            if files_done % 500 == 0:
+                print(f"Parsed {files_done} files, indexed {total_chunks} chunks ({time.time() - start:.0f}s)")
+    flush()
+
+    manager.save_local(output)
+
+    return {
+        "files": files_done,
+        "chunks": total_chunks,
+        "failures": failures,
+        "seconds": round(time.time() - start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-index a directory or zip archive into the persisted FAISS index.")
+    parser.add_argument("path", help="Directory or .zip archive to index")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=512, help="Chunks per embedding batch")
+    parser.add_argument("--output", default=INDEX_DIR, help="Index directory (default: data/faiss_index)")
+    parser.add_argument("--append", action="store_true", help="Add to an existing index instead of replacing it")
+    parser.add_argument("--allow-token-estimate", action="store_true",
+                        help="Size chunks from a length estimate if the tokenizer can't be loaded (e.g. offline)")
+    args = parser.parse_args()
+
+    if args.allow_token_estimate:
+        # Set before the worker processes start, so they inherit it
+        text_utils.ALLOW_TOKEN_ESTIMATE = True
+        os.environ["TOKENIZER_ALLOW_ESTIMATE"] = "1"
+    try:
+        # Fail once up front rather than once per file in the workers
+        text_utils.get_tokenizer()
+    except RuntimeError as e:
+        print(f"{e}\nOr pass --allow-token-estimate.")
+        sys.exit(1)
+
+    if not os.path.exists(args.path):
+        print(f"Path not found: {args.path}")
+        sys.exit(1)
+
+    summary = bulk_index(args.path, args.workers, args.batch_size, args.output, args.append)
+
+    for member, error in summary["failures"]:
+        print(f"Failed: {member}: {error}")
+    print(f"Indexed {summary['chunks']} chunks from {summary['files']} files in {summary['seconds']}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
-import sqlite3
+import argparse
 import os
+import sys
+from utils.sqlite_pool import get_connection
+from utils.migrations import migrate, verify_query_plans
 
 DB_DIR = os.path.join(os.path.dirname(__file__), "data")
 USERS_DB = os.path.join(DB_DIR, "users.db")
@@ -9,7 +12,7 @@ def init_dbs():
     os.makedirs(DB_DIR, exist_ok=True)
     
     # Init Users DB
-    conn = sqlite3.connect(USERS_DB)
+    conn = get_connection(USERS_DB)
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -36,7 +39,7 @@ def init_dbs():
     print(f"Initialized {USERS_DB}")
     
     # Init Pending Registration DB (for signup staging)
-    conn = sqlite3.connect(USERS_DB)
+    conn = get_connection(USERS_DB)
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS pending_users (
@@ -50,7 +53,7 @@ def init_dbs():
     conn.close()
 
     # Init Interactions DB
-    conn = sqlite3.connect(INTERACTIONS_DB)
+    conn = get_connection(INTERACTIONS_DB)
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS interactions (
@@ -75,7 +78,26 @@ def init_dbs():
     """)
     conn.commit()
     conn.close()
-    print(f"Initialized {INTERACTIONS_DB}")
+    version = migrate(INTERACTIONS_DB)
+    print(f"Initialized {INTERACTIONS_DB} (schema v{version})")
+
+def verify():
+    """Prints the query plan of every hot query; returns False if any scans or sorts where it shouldn't."""
+    ok = True
+    for name, plan, problems in verify_query_plans(INTERACTIONS_DB):
+        print(f"{'FAIL' if problems else 'ok  '} {name}")
+        for line in plan:
+            print(f"       {line}")
+        for problem in problems:
+            print(f"       -> {problem}")
+        ok = ok and not problems
+    return ok
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the SQLite databases and apply schema migrations.")
+    parser.add_argument("--verify", action="store_true", help="Check hot queries use their indexes (EXPLAIN QUERY PLAN)")
+    args = parser.parse_args()
+
     init_dbs()
+    if args.verify and not verify():
+        sys.exit(1)
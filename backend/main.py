@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -12,8 +13,23 @@ from init_dbs import init_dbs
 init_dbs()
 
 from routers import auth, chat, documents, settings, feedback
+from utils.executors import shutdown_executors
+from utils.upstream_clients import aclose_clients
+from utils.prompt_loader import prompt_registry
+from utils.sqlite_pool import close_all_pools
+from utils.text_utils import get_tokenizer
 
-app = FastAPI(title="GenAI Workspace API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail at startup, not on the first request, if token counting can't work
+    get_tokenizer()
+    yield
+    prompt_registry.stop_watching()
+    await aclose_clients()
+    shutdown_executors()
+    close_all_pools()
+
+app = FastAPI(title="GenAI Workspace API", lifespan=lifespan)
 
 app.include_router(auth.router)
 app.include_router(chat.router)
@@ -1,5 +1,5 @@
-import sqlite3
 import os
+from utils.sqlite_pool import get_connection
 
 DB_DIR = os.path.join(os.path.dirname(__file__), "data")
 USERS_DB = os.path.join(DB_DIR, "users.db")
@@ -8,7 +8,7 @@ INTERACTIONS_DB = os.path.join(DB_DIR, "interactions.db")
 def migrate():
     # Users DB
     print(f"Migrating Users DB at {USERS_DB}")
-    conn = sqlite3.connect(USERS_DB)
+    conn = get_connection(USERS_DB)
     c = conn.cursor()
     try:
         c.execute("ALTER TABLE users ADD COLUMN is_verified INTEGER DEFAULT 0")
@@ -34,7 +34,7 @@ def migrate():
     
     # Interactions DB
     print(f"Migrating Interactions DB at {INTERACTIONS_DB}")
-    conn = sqlite3.connect(INTERACTIONS_DB)
+    conn = get_connection(INTERACTIONS_DB)
     c = conn.cursor()
     try:
         c.execute("ALTER TABLE interactions ADD COLUMN feedback TEXT")
@@ -1,10 +1,10 @@
-import sqlite3
 import os
+from utils.sqlite_pool import get_connection
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "data", "interactions.db")
 
 def migrate_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     
     # Check if is_pinned column exists
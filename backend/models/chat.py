@@ -10,12 +10,23 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     model: str = "llama-3.3-70b-versatile"
     system_prompt: Optional[str] = None
+    cascade: bool = False # Draft with a small fast model first; use `model` only if the draft fails checks
 
 class ChatResponse(BaseModel):
     response: str
     conversation_id: str
     sources: List[dict] = []
     strategy: str
+    prompt_report: Optional[Dict[str, Any]] = None # Token budgets, usage and what was dropped
+    cached: bool = False # True if the answer came from the response cache
+    cascade_report: Optional[Dict[str, Any]] = None # Cascade tier and model that answered, and why it escalated
+
+class BatchChatRequest(BaseModel):
+    prompts: List[str]
+    model: str = "llama-3.3-70b-versatile"
+    system_prompt: Optional[str] = None
+    cascade: bool = False
+    concurrency: int = 4 # Generations in flight at once (capped server-side)
 
 class ConversationUpdate(BaseModel):
     title: Optional[str] = None
@@ -3,6 +3,8 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from utils.security import verify_password, get_password_hash, create_access_token, decode_access_token, SECRET_KEY, ALGORITHM
 from models.auth import User, UserCreate, Token, TokenData, OTPRequest, OTPVerify
 from utils.email_manager import send_otp_email, generate_otp
+from utils.executors import run_db
+from utils.sqlite_pool import get_connection
 import sqlite3
 import os
 from datetime import datetime, timedelta
@@ -19,10 +21,19 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 def get_db_connection():
     # Ensure directory exists (Render safety check)
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
+def get_user_record(email: str):
+    """Fetches a user row by email (None if missing)."""
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute("SELECT * FROM users WHERE email = ?", (email,))
+    user = c.fetchone()
+    conn.close()
+    return user
+
 @router.post("/signup", response_model=User)
 async def signup(user: UserCreate):
     conn = get_db_connection()
@@ -199,11 +210,8 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     except Exception:
         raise credentials_exception
         
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email = ?", (token_data.username,))
-    user = c.fetchone()
-    conn.close()
+    # Runs on every authenticated request, so keep the SQLite lookup off the event loop
+    user = await run_db(get_user_record, token_data.username)
     
     if user is None:
         raise credentials_exception
@@ -1,13 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from routers.auth import get_current_user
 from models.auth import User
-from models.chat import ChatRequest, ChatResponse, ConversationUpdate
+from models.chat import ChatRequest, ChatResponse, ConversationUpdate, BatchChatRequest
 from utils.retriever_agent import get_retriever_decision, RetrievalStrategy
 from state import vector_store
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from utils.text_utils import get_prompt_budget
+from utils.prompt_assembler import PromptAssembler, DEFAULT_BUDGETS
+from utils.response_cache import response_cache, fingerprint
+from utils.singleflight import SingleFlight
+from utils.sqlite_pool import get_connection
+from utils.conversation_summary import load_history_with_summary, update_conversation_summary, delete_summary
+from utils.executors import run_cpu, run_db
+from utils.upstream_clients import get_groq_chat
+from utils.rate_limiter import get_governor, RateLimitTimeout, ESTIMATED_COMPLETION_TOKENS
+from utils.circuit_breaker import get_breaker, is_provider_failure, CircuitOpenError
+from utils.deadline import start_deadline, current_deadline, set_deadline, run_stage, iterate_stage, has_time_for, DeadlineExceeded, BudgetSpent
+from utils.model_cascade import SMALL_MODEL, score_draft
+import time
 import os
+import asyncio
 import sqlite3
 import json
 import uuid
@@ -18,25 +30,59 @@ router = APIRouter(
     tags=["chat"],
 )
 
+CHAT_TEMPERATURE = 0.3
+DOCUMENT_CONTEXT_HEADER = "Context from uploaded documents:\n"
+
+# Identical concurrent requests share one vector search and one Groq completion
+retrieval_flight = SingleFlight()
+generation_flight = SingleFlight()
+
+# Unsummarised turns fetched per request; the prompt assembler decides how many actually fit
+HISTORY_FETCH_LIMIT = 50
+
+# /chat/batch limits: prompts per call, generations in flight, interactions per bulk insert
+BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_INSERT_SIZE = 25
+
 # Use absolute path for DB (same as auth.py)
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "interactions.db"))
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
+INSERT_INTERACTION_SQL = "INSERT INTO interactions (user_prompt, web_context, llm_response, source, sources, conversation_id, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
 def log_interaction_db(user_id, conversation_id, user_prompt, llm_response, source, sources):
     conn = get_db_connection()
     c = conn.cursor()
     sources_json = json.dumps(sources)
     c.execute(
-        "INSERT INTO interactions (user_prompt, web_context, llm_response, source, sources, conversation_id, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        INSERT_INTERACTION_SQL,
         (user_prompt, "", llm_response, source, sources_json, conversation_id, datetime.now())
     )
     conn.commit()
     conn.close()
 
+def log_interactions_db(conversation_id, rows):
+    """
+    Bulk-inserts interactions in one transaction.
+
+    Input:
+        conversation_id (str): Conversation they belong to.
+        rows (list): (user_prompt, llm_response, source, sources, timestamp) tuples.
+    """
+    conn = get_db_connection()
+    conn.executemany(
+        INSERT_INTERACTION_SQL,
+        [(prompt, "", response, source, json.dumps(sources), conversation_id, timestamp)
+         for prompt, response, source, sources, timestamp in rows]
+    )
+    conn.commit()
+    conn.close()
+
 def create_conversation_db(user_id, title):
     conn = get_db_connection()
     c = conn.cursor()
@@ -46,59 +92,90 @@ def create_conversation_db(user_id, title):
     conn.close()
     return conv_id
 
-def get_chat_history(conversation_id):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM interactions WHERE conversation_id = ? ORDER BY timestamp DESC LIMIT 10", (conversation_id,))
-    rows = c.fetchall()
-    conn.close()
-    messages = []
-    for row in reversed(rows):
-        messages.append(HumanMessage(content=row["user_prompt"]))
-        messages.append(AIMessage(content=row["llm_response"]))
-    return messages
-
-@router.post("/", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current_user)):
-    user_id = current_user.email 
-    
-    # Check Conversation ID
-    if not request.conversation_id:
-        title = request.message[:30] + "..."
-        request.conversation_id = create_conversation_db(user_id, title)
+def get_chat_history(conversation_id, limit=HISTORY_FETCH_LIMIT):
+    """
+    Returns the conversation's running summary plus the turns not yet folded into it.
     
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
+    Returns:
+        tuple: (summary, [(user_prompt, llm_response), ...] oldest first)
+    """
+    return load_history_with_summary(conversation_id, limit)
 
-    # 1. Decide Strategy (Simple/Manual for now to match reference)
-    # We can assume Vector Search if documents exist, or Web if explicit.
-    # For now, we'll do a simple "Smart Retrieval" check.
-    
-    # NOTE: In 'junior dev' style, we might just search indiscriminately to be safe and simple.
-    # But let's use the helper if available, or just default to vector search k=2
-    
-    context = ""
-    sources = []
-    strategy = "direct"
+async def retrieve_document_context(query: str):
+    """
+    Searches the uploaded documents for context.
     
+    Returns:
+        tuple: (chunks, sources, strategy) - no chunks and 'direct' if nothing was found.
+    """
     # Simple Heuristic: If there are docs in vector store, search them.
-    # But checking vector_store size is hard without a count method.
-    # Let's just try to search and see if we get anything good.
     try:
-        docs = vector_store.similarity_search(request.message, k=2)
+        docs, _ = await retrieval_flight.do(
+            " ".join(query.lower().split()),
+            lambda: run_cpu(vector_store.similarity_search, query, k=2)
+        )
         if docs:
-            context_text = "\n\n".join([d.page_content for d in docs])
-            context = f"Context from uploaded documents:\n{context_text}"
-            sources = [{"title": "Document Context", "url": "#"}]
-            strategy = "vector"
+            return [d.page_content for d in docs], [{"title": "Document Context", "url": "#"}], "vector"
     except Exception:
         pass # Vector store might be empty or uninitialized
+    return [], [], "direct"
+
+async def retrieval_stage(query: str):
+    """Document retrieval within its share of the request deadline; answers without context if it runs out."""
+    try:
+        return await run_stage("retrieval", retrieve_document_context(query))
+    except DeadlineExceeded as e:
+        print(f"{e}; answering without document context")
+        return [], [], "direct"
+
+async def prepare_chat(request: ChatRequest, user_id: str):
+    """
+    Runs everything before generation: conversation setup, retrieval, history and prompt.
+    Shared by the blocking and streaming chat endpoints. SQLite and FAISS calls run on
+    dedicated executors so the event loop stays free while they block.
+    
+    Returns:
+        tuple: (llm, messages, sources, strategy, prompt_report)
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
+
+    # 1. Conversation setup and retrieval are independent, so run them concurrently.
+    # A new conversation has no history or summary, so creating it replaces the history load.
+    new_conversation = not request.conversation_id
+    if new_conversation:
+        title = request.message[:30] + "..."
+        conversation_stage = run_db(create_conversation_db, user_id, title)
+    else:
+        conversation_stage = run_db(get_chat_history, request.conversation_id)
+
+    (context_chunks, sources, strategy), conversation_result = await asyncio.gather(
+        retrieval_stage(request.message),
+        conversation_stage
+    )
+    if new_conversation:
+        request.conversation_id = conversation_result
+        summary, history = "", []
+    else:
+        summary, history = conversation_result
 
     # 2. Setup LLM
-    llm = ChatGroq(temperature=0.3, groq_api_key=api_key, model_name=request.model)
+    llm = get_groq_chat(api_key, request.model, CHAT_TEMPERATURE)
+
+    # 3-4. System prompt and message list within per-section token budgets
+    messages, prompt_report = assemble_messages(request, context_chunks, history, summary)
+    
+    return llm, messages, sources, strategy, prompt_report
+
+def assemble_messages(request: ChatRequest, context_chunks, history=None, summary=""):
+    """
+    Builds the system prompt and the message list within per-section token budgets.
 
-    # 3. Construct System Prompt (The "Reasoning" Part)
+    Returns:
+        tuple: (messages, prompt_report)
+    """
+    # Construct System Prompt (The "Reasoning" Part)
     # Ref: Reference project uses "IMPORTANT: ... Explain all code..."
     
     reasoning_instruction = (
@@ -109,28 +186,357 @@ def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current
     )
     
     base_system = request.system_prompt if request.system_prompt else "You are a helpful assistant."
-    full_system_prompt = f"{base_system}\n\n[INSTRUCTIONS]: {reasoning_instruction}\n\n{context}"
+    system_prompt = f"{base_system}\n\n[INSTRUCTIONS]: {reasoning_instruction}"
 
-    # 4. Chat History
-    history = get_chat_history(request.conversation_id)
+    assembler = PromptAssembler(total_budget=min(sum(DEFAULT_BUDGETS.values()), get_prompt_budget(request.model)))
+    return assembler.assemble(
+        system=system_prompt,
+        message=request.message,
+        context_chunks=context_chunks,
+        history=history or [],
+        context_header=DOCUMENT_CONTEXT_HEADER,
+        summary=summary
+    )
+
+async def acquire_generation_capacity(prompt_report):
+    """
+    Waits for Groq rate-limit capacity for one completion. If none frees up within
+    the queue timeout, the client gets a 429 with a Retry-After instead of us
+    sending a request Groq would reject.
+    """
+    try:
+        await get_governor("groq").aacquire(tokens=prompt_report["total_tokens"] + ESTIMATED_COMPLETION_TOKENS)
+    except RateLimitTimeout as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, int(e.wait)))})
+
+def reported_tokens(message):
+    """Total tokens Groq reports for a response (or the last stream chunk), or None if absent."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage and usage.get("total_tokens") is not None:
+        return usage["total_tokens"]
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("total_tokens")
+
+def record_generation_usage(prompt_report, actual):
+    """Swaps the completion's token reservation for the usage Groq actually reported."""
+    get_governor("groq").record_usage(prompt_report["total_tokens"] + ESTIMATED_COMPLETION_TOKENS, actual)
+
+async def call_groq(llm, messages, prompt_report, stage="generation"):
+    """
+    One completion: waits for rate-limit capacity, then runs within the stage's share of
+    the deadline. If the wait left no real budget, raises BudgetSpent without calling Groq.
+    """
+    await acquire_generation_capacity(prompt_report)
+    response = await run_stage(stage, llm.ainvoke(messages))
+    record_generation_usage(prompt_report, reported_tokens(response))
+    return response
+
+def uses_cascade(request: ChatRequest) -> bool:
+    return request.cascade and request.model != SMALL_MODEL
+
+def chat_cache_key(messages, request: ChatRequest) -> str:
+    # Cascade answers may come from the small model, so they're cached apart from plain ones
+    params = {"cascade": True} if uses_cascade(request) else {}
+    return fingerprint(messages, request.model, temperature=CHAT_TEMPERATURE, **params)
+
+async def cascade_draft(request: ChatRequest, messages, prompt_report):
+    """
+    First tier of the model cascade: answers with the small model and scores the
+    draft (length, refusals, grounding in the retrieved context). A failed check,
+    or any error from the small model, escalates to request.model.
+
+    Returns:
+        tuple: (draft text or None to escalate, cascade_report)
+    """
+    small_llm = get_groq_chat(os.getenv("GROQ_API_KEY"), SMALL_MODEL, CHAT_TEMPERATURE)
+    try:
+        draft = await get_breaker("groq").acall(lambda: call_groq(small_llm, messages, prompt_report, stage="draft"))
+    except HTTPException:
+        raise # No rate-limit capacity: the large model wouldn't get any either
+    except Exception as e:
+        print(f"Cascade draft failed ({e}); escalating to {request.model}")
+        reasons = ["draft_error"]
+    else:
+        context = messages[0]["content"].partition(DOCUMENT_CONTEXT_HEADER)[2]
+        finish_reason = draft.response_metadata.get("finish_reason")
+        passed, reasons = score_draft(draft.content, request.message, context, finish_reason)
+        if passed:
+            return draft.content, {"tier": "small", "model": SMALL_MODEL, "escalated_because": []}
+        print(f"Cascade draft rejected ({', '.join(reasons)}); escalating to {request.model}")
+    return None, {"tier": "large", "model": request.model, "escalated_because": reasons}
+
+async def fallback_answer(cache_key, error):
+    """
+    Answer to serve while Groq is unavailable or the deadline has run out: an expired
+    cached answer to the same prompt if one is still on disk, otherwise a 503 telling
+    the client when to retry (504 for a missed deadline).
+    """
+    stale = await run_db(response_cache.get, cache_key, allow_expired=True)
+    if stale is not None:
+        return stale
+    if isinstance(error, DeadlineExceeded):
+        raise HTTPException(status_code=504, detail=str(error))
+    retry_after = error.retry_after if isinstance(error, CircuitOpenError) else get_breaker("groq").retry_after()
+    raise HTTPException(status_code=503, detail=f"Model provider unavailable: {error}", headers={"Retry-After": str(max(1, int(retry_after)))})
+
+async def generate_answer(request: ChatRequest, llm, messages, prompt_report, cache_key):
+    """
+    Answers an assembled prompt from the response cache, the model cascade or
+    request.model (async HTTP, no thread held while Groq generates). Identical
+    prompts in flight at once share one call. While Groq is unhealthy or time is
+    up, falls back to a stale cached answer.
+
+    Returns:
+        tuple: (response text, cached, cascade_report)
+    """
+    async def generate():
+        cached_text = await run_db(response_cache.get, cache_key)
+        if cached_text is not None:
+            return cached_text, True, None
+
+        cascade_report = None
+        if uses_cascade(request):
+            draft_text, cascade_report = await cascade_draft(request, messages, prompt_report)
+            if draft_text is not None:
+                await run_db(response_cache.set, cache_key, draft_text)
+                return draft_text, False, cascade_report
+
+        # Fail fast while Groq is unhealthy (or time is up) and fall back to a cached answer
+        try:
+            response = await get_breaker("groq").acall(lambda: call_groq(llm, messages, prompt_report))
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            return await fallback_answer(cache_key, e), True, None
+        except Exception as e:
+            if not is_provider_failure(e):
+                raise
+            return await fallback_answer(cache_key, e), True, None
+        await run_db(response_cache.set, cache_key, response.content)
+        return response.content, False, cascade_report
+
+    result, _ = await generation_flight.do(cache_key, generate)
+    return result
+
+def sse_event(event: str, data: dict) -> str:
+    """Formats one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
+    # Every stage below sizes its timeouts from this request's deadline
+    # (contextvar; each request runs in its own task context)
+    start_deadline()
+    user_id = current_user.email 
+    llm, messages, sources, strategy, prompt_report = await prepare_chat(request, user_id)
     
-    # 5. Build Message List
-    messages = [SystemMessage(content=full_system_prompt)] + history + [HumanMessage(content=request.message)]
+    # 5. Run, unless this exact prompt was answered recently or is being answered right now
+    cache_key = chat_cache_key(messages, request)
+    response_text, cached, cascade_report = await generate_answer(request, llm, messages, prompt_report, cache_key)
     
-    # 6. Run
-    response = llm.invoke(messages)
-    response_text = response.content
+    # 6. Log
+    await run_db(log_interaction_db, user_id, request.conversation_id, request.message, response_text, strategy, sources)
     
-    # 7. Log
-    log_interaction_db(user_id, request.conversation_id, request.message, response_text, strategy, sources)
+    # Fold older turns into the running summary after the response has gone out
+    background_tasks.add_task(update_conversation_summary, request.conversation_id)
     
     return ChatResponse(
         response=response_text,
         conversation_id=request.conversation_id,
         sources=sources,
-        strategy=strategy
+        strategy=strategy,
+        prompt_report=prompt_report,
+        cached=cached,
+        cascade_report=cascade_report
+    )
+
+@router.post("/stream")
+async def chat_stream_endpoint(request: ChatRequest, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
+    """
+    Streaming variant of /chat/ (server-sent events).
+    
+    Events, in order:
+        sources: {"conversation_id", "sources", "strategy", "prompt_report", "cached", "cascade_report"} - sent before generation starts
+        token:   {"content"} - one per chunk from the Groq stream (a single event on a cache hit or accepted cascade draft)
+        done:    {"conversation_id"} - after the interaction has been logged
+        error:   {"detail"} - if generation fails or runs out of time mid-stream
+    """
+    start_deadline()
+    deadline = current_deadline()
+    user_id = current_user.email
+    llm, messages, sources, strategy, prompt_report = await prepare_chat(request, user_id)
+    cache_key = chat_cache_key(messages, request)
+    cached_text = await run_db(response_cache.get, cache_key)
+    # A cascade draft can't be un-sent, so it's generated and scored before the stream opens
+    draft_text, cascade_report = None, None
+    if cached_text is None and uses_cascade(request):
+        draft_text, cascade_report = await cascade_draft(request, messages, prompt_report)
+    breaker = get_breaker("groq")
+    # True once this request holds the call slot (the half-open probe while recovering); given back in event_stream
+    claimed = False
+    if cached_text is None and draft_text is None:
+        claimed = breaker.allow_request()
+        if not claimed:
+            cached_text = await fallback_answer(cache_key, CircuitOpenError("groq", breaker.retry_after()))
+            cascade_report = None
+    if claimed:
+        # Queue for capacity before the stream opens, so a timeout is still a plain 429
+        try:
+            await acquire_generation_capacity(prompt_report)
+        except BaseException:
+            breaker.release()
+            raise
+        if not has_time_for("generation"):
+            # Queueing used up the deadline: answer 504 (or a stale answer) without calling Groq,
+            # which says nothing about its health
+            breaker.release()
+            claimed = False
+            cached_text = await fallback_answer(cache_key, BudgetSpent("generation"))
+
+    async def event_stream():
+        try:
+            # The generator runs after the handler has returned, in the response's context
+            set_deadline(deadline)
+            yield sse_event("sources", {
+                "conversation_id": request.conversation_id,
+                "sources": sources,
+                "strategy": strategy,
+                "prompt_report": prompt_report,
+                "cached": cached_text is not None,
+                "cascade_report": cascade_report
+            })
+            
+            if cached_text is not None:
+                response_text = cached_text
+                yield sse_event("token", {"content": cached_text})
+            elif draft_text is not None:
+                response_text = draft_text
+                yield sse_event("token", {"content": draft_text})
+                await run_db(response_cache.set, cache_key, draft_text)
+            else:
+                parts = []
+                usage = None
+                start = time.monotonic()
+                try:
+                    async for chunk in iterate_stage("generation", llm.astream(messages)):
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            yield sse_event("token", {"content": chunk.content})
+                        # Groq reports usage on the final chunk
+                        usage = reported_tokens(chunk) or usage
+                except Exception as e:
+                    if isinstance(e, DeadlineExceeded) and parts:
+                        # Tokens were still arriving: a healthy answer longer than the deadline allows
+                        breaker.release()
+                    else:
+                        breaker.record_error(e)
+                    yield sse_event("error", {"detail": str(e)})
+                    return
+                breaker.record_success(time.monotonic() - start)
+                record_generation_usage(prompt_report, usage)
+                response_text = "".join(parts)
+                await run_db(response_cache.set, cache_key, response_text)
+            
+            # Log once the full answer is known
+            await run_db(log_interaction_db, user_id, request.conversation_id, request.message, response_text, strategy, sources)
+            yield sse_event("done", {"conversation_id": request.conversation_id})
+        finally:
+            # Client disconnected or the task was cancelled anywhere in the stream: don't leave a
+            # half-open probe claimed. A stream that never starts is covered by the probe timeout.
+            if claimed:
+                breaker.release()
+
+    # Runs after the stream has finished (and the interaction has been logged)
+    background_tasks.add_task(update_conversation_summary, request.conversation_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+@router.post("/batch")
+async def chat_batch_endpoint(request: BatchChatRequest, current_user: User = Depends(get_current_user)):
+    """
+    Answers many independent prompts in one call (offline evaluation, bulk Q&A).
+    Prompts see neither each other nor any history. Retrieval is batched (one
+    embedding call for all prompts), generations run with
+    bounded concurrency and interactions are bulk-inserted into one new conversation.
+
+    Streams NDJSON, one object per line in completion order:
+        {"index", "prompt", "response", "sources", "strategy", "cached", "cascade_report"} per answered prompt
+        {"index", "prompt", "error"} per failed prompt
+        {"done": true, "conversation_id", "count", "errors"} last
+    """
+    if not request.prompts:
+        raise HTTPException(status_code=400, detail="No prompts given")
+    if len(request.prompts) > BATCH_MAX_PROMPTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_PROMPTS} prompts per batch")
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
+
+    user_id = current_user.email
+    conversation_id = await run_db(create_conversation_db, user_id, f"Batch: {request.prompts[0][:23]}...")
+    try:
+        doc_lists = await run_cpu(vector_store.similarity_search_batch, request.prompts, k=2)
+    except Exception as e:
+        print(f"Batch retrieval failed ({e}); answering without document context")
+        doc_lists = [[] for _ in request.prompts]
+    llm = get_groq_chat(api_key, request.model, CHAT_TEMPERATURE)
+    semaphore = asyncio.Semaphore(max(1, min(request.concurrency, BATCH_MAX_CONCURRENCY)))
+
+    async def answer(index, prompt, docs):
+        async with semaphore:
+            # Each prompt gets its own deadline, started when it's actually sent (tasks have their own context)
+            start_deadline()
+            item = ChatRequest(message=prompt, conversation_id=conversation_id, model=request.model,
+                               system_prompt=request.system_prompt, cascade=request.cascade)
+            context_chunks = [d.page_content for d in docs]
+            sources = [{"title": "Document Context", "url": "#"}] if context_chunks else []
+            strategy = "vector" if context_chunks else "direct"
+            messages, prompt_report = assemble_messages(item, context_chunks)
+            try:
+                response_text, cached, cascade_report = await generate_answer(
+                    item, llm, messages, prompt_report, chat_cache_key(messages, item)
+                )
+            except HTTPException as e:
+                return {"index": index, "prompt": prompt, "error": e.detail}
+            except Exception as e:
+                return {"index": index, "prompt": prompt, "error": str(e)}
+            return {
+                "index": index,
+                "prompt": prompt,
+                "response": response_text,
+                "sources": sources,
+                "strategy": strategy,
+                "cached": cached,
+                "cascade_report": cascade_report
+            }
+
+    async def ndjson_stream():
+        tasks = [asyncio.create_task(answer(i, p, docs)) for i, (p, docs) in enumerate(zip(request.prompts, doc_lists))]
+        rows, errors = [], 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if "error" in result:
+                    errors += 1
+                else:
+                    # Stamped when this answer completed, so history keeps the order answers arrived in
+                    rows.append((result["prompt"], result["response"], result["strategy"], result["sources"], datetime.now()))
+                    if len(rows) >= BATCH_INSERT_SIZE:
+                        await run_db(log_interactions_db, conversation_id, rows)
+                        rows = []
+                yield json.dumps(result) + "\n"
+            if rows:
+                await run_db(log_interactions_db, conversation_id, rows)
+            yield json.dumps({"done": True, "conversation_id": conversation_id, "count": len(tasks), "errors": errors}) + "\n"
+        finally:
+            # Client went away: stop generating answers nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
 @router.get("/history")
 def get_conversations(current_user: User = Depends(get_current_user)):
     conn = get_db_connection()
@@ -181,6 +587,7 @@ def delete_conversation(conversation_id: str, current_user: User = Depends(get_c
     c.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
     conn.commit()
     conn.close()
+    delete_summary(conversation_id)
     return {"message": "Conversation deleted"}
 
 @router.get("/history/{conversation_id}")
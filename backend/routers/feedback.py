@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
+from utils.sqlite_pool import get_connection
 
 router = APIRouter(
     prefix="/feedback",
@@ -13,7 +14,6 @@ class FeedbackRequest(BaseModel):
 
 @router.post("/")
 async def submit_feedback(data: FeedbackRequest):
-    import sqlite3
     import os
     # We need to find the interaction. Since we don't have message_id in interactions table explicitly (we use conversation_id + row), 
     # we might need to assume message_id is actually conversation_id + timestamp or index.
@@ -24,7 +24,7 @@ async def submit_feedback(data: FeedbackRequest):
     # 1. Update the interactions table to have a 'feedback' column.
     
     DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "interactions.db")
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     
     # Check if column exists, if not create (migration)
@@ -3,6 +3,7 @@ from models.auth import User
 from routers.auth import get_current_user, get_db_connection
 from utils.security import get_password_hash, verify_password
 from pydantic import BaseModel
+from utils.sqlite_pool import get_connection
 
 router = APIRouter(
     prefix="/settings",
@@ -50,14 +51,13 @@ async def delete_account(current_user: User = Depends(get_current_user)):
         # For simplicity in this structure, we assume separate DBs. 
         # We will connect to interactions.db explicitly here.
         import os
-        import sqlite3
         INTERACTIONS_DB = os.path.join(os.path.dirname(__file__), "..", "data", "interactions.db")
         
         # We need to know which conversations belong to this user.
         # Ideally, we should have used the same DB or attached tables.
         # Let's clean up conversations by user ID (email)
         
-        conn_int = sqlite3.connect(INTERACTIONS_DB)
+        conn_int = get_connection(INTERACTIONS_DB)
         c_int = conn_int.cursor()
         
         # Get all conversation IDs for user
@@ -65,6 +65,7 @@ async def delete_account(current_user: User = Depends(get_current_user)):
         convs = c_int.fetchall()
         for conv in convs:
             c_int.execute("DELETE FROM interactions WHERE conversation_id = ?", (conv[0],))
+            c_int.execute("DELETE FROM conversation_summaries WHERE conversation_id = ?", (conv[0],))
         
         c_int.execute("DELETE FROM conversations WHERE user_id = ?", (current_user.email,))
         conn_int.commit()
@@ -80,12 +81,11 @@ async def delete_account(current_user: User = Depends(get_current_user)):
 
 @router.delete("/memory")
 async def clear_memory(current_user: User = Depends(get_current_user)):
-    import sqlite3
     import os
     INTERACTIONS_DB = os.path.join(os.path.dirname(__file__), "..", "data", "interactions.db")
     
     try:
-        conn = sqlite3.connect(INTERACTIONS_DB)
+        conn = get_connection(INTERACTIONS_DB)
         c = conn.cursor()
         
         # Delete interactions for user's conversations
@@ -93,6 +93,7 @@ async def clear_memory(current_user: User = Depends(get_current_user)):
         convs = c.fetchall()
         for conv in convs:
             c.execute("DELETE FROM interactions WHERE conversation_id = ?", (conv[0],))
+            c.execute("DELETE FROM conversation_summaries WHERE conversation_id = ?", (conv[0],))
         
         # Delete conversations themselves
         c.execute("DELETE FROM conversations WHERE user_id = ?", (current_user.email,))
@@ -2,3 +2,7 @@ from utils.vector_store_manager import VectorStoreManager
 
 # Global singleton for vector store
 vector_store = VectorStoreManager()
+
+# Pick up an index seeded offline by bulk_index.py
+if vector_store.load_local():
+    print("Loaded persisted vector index.")
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN, HALF_OPEN, CLOSED
+from utils.deadline import start_deadline, reset_deadline, run_stage, DeadlineExceeded, BudgetSpent, MIN_STAGE_SECONDS
+
+
+def test_stage_timeouts_open_the_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+
+    async def hung_provider():
+        return await run_stage("generation", asyncio.sleep(10))
+
+    async def scenario():
+        for _ in range(2):
+            token = start_deadline(MIN_STAGE_SECONDS + 0.1)
+            try:
+                with pytest.raises(DeadlineExceeded):
+                    await breaker.acall(hung_provider, hedge=False)
+            finally:
+                reset_deadline(token)
+        with pytest.raises(CircuitOpenError):
+            await breaker.acall(hung_provider, hedge=False)
+
+    asyncio.run(scenario())
+    assert breaker.state == OPEN
+    assert breaker.failures == 2
+
+
+def half_open_breaker(**kwargs):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0, **kwargs)
+    breaker.record_failure()
+    return breaker
+
+
+def test_cancelled_probe_is_released():
+    breaker = half_open_breaker()
+
+    async def scenario():
+        probe = asyncio.create_task(breaker.acall(lambda: asyncio.sleep(10), hedge=False))
+        await asyncio.sleep(0.01)
+        assert breaker.state == HALF_OPEN and breaker.is_open()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # The next caller becomes the probe instead of being rejected forever
+        await breaker.acall(lambda: asyncio.sleep(0), hedge=False)
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+def test_lost_probe_expires():
+    breaker = half_open_breaker(probe_timeout=0.05)
+    assert breaker.allow_request()  # Claimed and never reported back
+    assert not breaker.allow_request()
+    time.sleep(0.06)
+    assert not breaker.is_open()
+    assert breaker.allow_request()
+
+
+def test_spent_budget_does_not_count_against_the_provider():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+    calls = []
+
+    async def healthy_provider():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        # Earlier stages (e.g. queueing for rate-limit capacity) used up the deadline
+        token = start_deadline(0.01)
+        try:
+            for _ in range(3):
+                with pytest.raises(BudgetSpent):
+                    await breaker.acall(lambda: run_stage("generation", healthy_provider()), hedge=False)
+        finally:
+            reset_deadline(token)
+
+    asyncio.run(scenario())
+    assert calls == []
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
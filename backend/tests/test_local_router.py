@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import utils.local_router as local_router
+from utils.local_router import RouterClassifier
+
+embeddings = DeterministicFakeEmbedding(size=16)
+
+
+def assert_vectors_match_examples(classifier):
+    expected = np.array(embeddings.embed_documents([e["query"] for e in classifier.examples]), dtype="float32")
+    assert np.allclose(classifier.vectors, expected)
+
+
+def test_examples_are_saved_in_batches(tmp_path):
+    path = tmp_path / "router_examples.json"
+    classifier = RouterClassifier(path=str(path), save_every=3)
+
+    classifier.add_example("q0", "direct_llm")
+    classifier.add_example("q1", "web_search")
+    assert not path.exists()
+
+    classifier.add_example("q2", "direct_llm")
+    assert [e["query"] for e in json.loads(path.read_text())] == ["q0", "q1", "q2"]
+    assert not (tmp_path / "router_examples.json.tmp").exists()
+
+    classifier.add_example("q3", "web_search")
+    classifier.flush()
+    assert len(RouterClassifier(path=str(path)).examples) == 4
+
+
+def test_vectors_stay_aligned_with_examples(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_router, "MAX_EXAMPLES", 4)
+    classifier = RouterClassifier(path=str(tmp_path / "router_examples.json"))
+    for i in range(3):
+        classifier.add_example(f"q{i}", "direct_llm")
+    classifier._ensure_vectors(embeddings)
+
+    # A known vector is appended as is; one without is embedded on the next prediction
+    classifier.add_example("q3", "web_search", query_vector=embeddings.embed_query("q3"))
+    classifier.add_example("q4", "web_search")
+    assert [e["query"] for e in classifier.examples] == ["q1", "q2", "q3", "q4"]
+    assert len(classifier.vectors) == 3
+
+    classifier._ensure_vectors(embeddings)
+    assert_vectors_match_examples(classifier)
@@ -0,0 +1,81 @@
+import pytest
+
+import init_dbs
+from utils.migrations import migrate, verify_query_plans, HOT_QUERIES, INTERACTIONS_MIGRATIONS
+from utils.sqlite_pool import get_connection
+
+LATEST_VERSION = INTERACTIONS_MIGRATIONS[-1][0]
+
+
+@pytest.fixture
+def interactions_db(tmp_path, monkeypatch):
+    """A fresh interactions.db built the way the app does on startup (base tables, then migrations)."""
+    monkeypatch.setattr(init_dbs, "DB_DIR", str(tmp_path))
+    monkeypatch.setattr(init_dbs, "USERS_DB", str(tmp_path / "users.db"))
+    monkeypatch.setattr(init_dbs, "INTERACTIONS_DB", str(tmp_path / "interactions.db"))
+    init_dbs.init_dbs()
+    return str(tmp_path / "interactions.db")
+
+
+def schema(db_path):
+    conn = get_connection(db_path)
+    try:
+        return conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+    finally:
+        conn.close()
+
+
+def user_version(db_path):
+    conn = get_connection(db_path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def count_summaries(db_path):
+    conn = get_connection(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM conversation_summaries").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_migrate_reaches_latest_version(interactions_db):
+    assert user_version(interactions_db) == LATEST_VERSION
+
+
+@pytest.mark.parametrize("name", [query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_its_index(interactions_db, name):
+    plans = {query_name: (plan, problems) for query_name, plan, problems in verify_query_plans(interactions_db)}
+    plan, problems = plans[name]
+    assert problems == [], f"{name}: {plan}"
+
+
+def test_rerunning_migrations_is_a_noop(interactions_db):
+    before = schema(interactions_db)
+
+    def must_not_run(cursor):
+        raise AssertionError("migration re-applied")
+
+    already_applied = [(version, description, must_not_run) for version, description, _ in INTERACTIONS_MIGRATIONS]
+    assert migrate(interactions_db, already_applied) == LATEST_VERSION
+    assert migrate(interactions_db) == LATEST_VERSION
+    assert schema(interactions_db) == before
+    assert user_version(interactions_db) == LATEST_VERSION
+
+
+def test_deleting_conversations_drops_their_summaries(interactions_db, monkeypatch):
+    from utils import database
+    monkeypatch.setattr(database, "DB_FILE", interactions_db)
+    conn = get_connection(interactions_db)
+    for conversation_id in ("c1", "c2", "c3"):
+        conn.execute("INSERT INTO conversations (id, user_id, title) VALUES (?, ?, ?)", (conversation_id, "u1", "t"))
+        conn.execute("INSERT INTO conversation_summaries (conversation_id, summary) VALUES (?, ?)", (conversation_id, "s"))
+    conn.commit()
+    conn.close()
+
+    database.delete_conversation("c1")
+    assert count_summaries(interactions_db) == 2
+    database.delete_all_user_conversations("u1")
+    assert count_summaries(interactions_db) == 0
@@ -0,0 +1,18 @@
+from utils.response_cache import search_cache_key
+
+
+def test_search_key_normalises_case_and_whitespace():
+    assert search_cache_key("Latest  Python release", "basic") == search_cache_key("latest python release ", "basic")
+
+
+def test_search_key_keeps_distinct_queries_apart():
+    assert search_cache_key("flights from paris to rome", "basic") != search_cache_key("flights from rome to paris", "basic")
+    assert search_cache_key("python release", "basic") != search_cache_key("what is the python release", "basic")
+    assert search_cache_key("python release", "basic") != search_cache_key("python release", "advanced")
+    assert search_cache_key("python release", "basic", ["python.org"]) != search_cache_key("python release", "basic")
+
+
+def test_loose_search_key_merges_rewordings():
+    assert search_cache_key("latest python release?", "basic", loose=True) == \
+        search_cache_key("what is the latest release of Python", "basic", loose=True)
+    assert search_cache_key("python release", "basic", loose=True) != search_cache_key("python release", "basic")
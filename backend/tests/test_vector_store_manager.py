@@ -0,0 +1,39 @@
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.vector_store_manager import VectorStoreManager
+
+TOPICS = ["caching", "indexing", "rate limits", "embeddings", "summaries", "deadlines", "pooling", "routing"]
+
+
+def make_manager():
+    manager = VectorStoreManager()
+    manager.embeddings = DeterministicFakeEmbedding(size=64)
+    manager.add_documents([
+        Document(page_content=f"Notes on {topic}, part {part}", metadata={"topic": topic, "part": part})
+        for topic in TOPICS for part in range(3)
+    ])
+    return manager
+
+
+def test_batch_search_matches_single_searches():
+    manager = make_manager()
+    queries = ["Notes on caching, part 1", "rate limits", "how does routing work", "Notes on pooling, part 2"]
+
+    batch = manager.similarity_search_batch(queries, k=3)
+
+    assert len(batch) == len(queries)
+    for query, docs in zip(queries, batch):
+        expected = manager.similarity_search(query, k=3)
+        assert [d.page_content for d in docs] == [d.page_content for d in expected]
+        assert [d.metadata for d in docs] == [d.metadata for d in expected]
+
+
+def test_batch_search_with_fewer_documents_than_k():
+    manager = make_manager()
+    assert [len(docs) for docs in manager.similarity_search_batch(["caching"], k=100)] == [len(TOPICS) * 3]
+
+
+def test_batch_search_without_documents():
+    manager = VectorStoreManager()
+    assert manager.similarity_search_batch(["a", "b"], k=2) == [[], []]
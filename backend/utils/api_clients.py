@@ -1,10 +1,25 @@
+import time
+import httpx
 import streamlit as st
-import requests
-from tavily import TavilyClient
+from utils.upstream_clients import get_http_client, GROQ_BASE_URL, TAVILY_BASE_URL
+from utils.response_cache import response_cache, fingerprint, web_search_cache, search_cache_key
+from utils.singleflight import ThreadSingleFlight
+from utils.rate_limiter import get_governor, backoff_delay, retry_after_seconds, RateLimitTimeout, RETRYABLE_STATUS_CODES, ESTIMATED_COMPLETION_TOKENS
+from utils.text_utils import count_message_tokens
+from utils.circuit_breaker import get_breaker, CircuitOpenError
+from utils.deadline import http_timeout, can_wait, DeadlineExceeded
+
+# Identical prompts submitted concurrently (across Streamlit sessions) share one Groq call
+groq_flight = ThreadSingleFlight()
+tavily_flight = ThreadSingleFlight()
+
+def combine_results(results_list):
+    return "\n\n".join(result["content"] for result in results_list)
 
 def run_tavily_search(query: str, search_depth: str = "advanced", result_count: int = 7, sites: list = None):
     """
-    Executes a web search using the Tavily API with retry logic.
+    Executes a web search using the Tavily API with retry logic. Repeat and
+    near-duplicate searches are served from the web search cache.
     
     Input:
         query (str): Search term.
@@ -18,41 +33,79 @@ def run_tavily_search(query: str, search_depth: str = "advanced", result_count:
     api_key = st.session_state.get("TAVILY_API_KEY")
     if not api_key:
         return "Error: Tavily API key not set.", []
-    
 
+    cache_key = search_cache_key(query, search_depth, sites)
+    cached = web_search_cache.get(cache_key)
+    if cached is not None and cached["count"] >= result_count:
+        results_list = cached["results"][:result_count]
+        return combine_results(results_list), results_list
+
+    result, _ = tavily_flight.do(
+        f"{cache_key}:{result_count}",
+        lambda: _run_tavily_search_uncached(query, search_depth, result_count, sites, api_key, cache_key)
+    )
+    return result
+
+def _run_tavily_search_uncached(query, search_depth, result_count, sites, api_key, cache_key):
+    """Calls Tavily with retries and caches successful results."""
     # Retry logic
     max_retries = 3
     last_error = None
     
+    client = get_http_client("tavily")
+    governor = get_governor("tavily")
+    breaker = get_breaker("tavily")
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    retry_after = None
+    
     for attempt in range(max_retries):
+        if attempt:
+            # Back off (at least as long as the server asked) instead of retrying immediately,
+            # unless that would eat the rest of the request's time
+            delay = backoff_delay(attempt - 1, retry_after)
+            if not can_wait(delay, "web_search"):
+                last_error = DeadlineExceeded("web search")
+                break
+            time.sleep(delay)
+            retry_after = None
         try:
-            client = TavilyClient(api_key=api_key)
-            params = {"query": query, "search_depth": search_depth, "max_results": result_count}
+            params = {"api_key": api_key, "query": query, "search_depth": search_depth, "max_results": result_count}
             
             if sites:
                 if sites[0]:
                     params["include_domains"] = sites
             
-            response = client.search(**params)
+            def send():
+                governor.acquire()
+                http_response = client.post(f"{TAVILY_BASE_URL}/search", headers=headers, json=params, timeout=http_timeout("web_search"))
+                http_response.raise_for_status()
+                return http_response.json()
+            
+            response = breaker.call(send)
             
 
-            results_content = []
             results_list = response.get("results", [])
+            web_search_cache.set(cache_key, {"count": result_count, "results": results_list})
+            return combine_results(results_list), results_list
             
-            for result in results_list:
-                content = result["content"]
-                results_content.append(content)
-                
-            combined_content = "\n\n".join(results_content)
-            return combined_content, results_list
-            
+        except (RateLimitTimeout, CircuitOpenError) as e:
+            last_error = e
+            break
+        except httpx.HTTPStatusError as e:
+            last_error = e
+            if e.response.status_code not in RETRYABLE_STATUS_CODES:
+                break
+            retry_after = retry_after_seconds(e.response)
         except Exception as e:
             last_error = e
             # Continue to next attempt
             continue
             
     # If we failed all attempts
-    return f"Error during Tavily search after {max_retries} attempts: {last_error}", []
+    return f"Error during Tavily search: {last_error}", []
 
 def ask_groq(messages: list, model: str, temperature: float):
     """
@@ -70,12 +123,35 @@ def ask_groq(messages: list, model: str, temperature: float):
     if not api_key:
         return "Error: Groq API key not set."
         
+    # Identical prompt answered recently? (page reloads, reruns, shared questions)
+    cache_key = fingerprint(messages, model, temperature=temperature)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    response_text, _ = groq_flight.do(cache_key, lambda: _ask_groq_uncached(messages, model, temperature, api_key, cache_key))
+    return response_text
+
+def _ask_groq_uncached(messages: list, model: str, temperature: float, api_key: str, cache_key: str):
+    """Calls Groq with retries and caches a successful answer."""
     max_retries = 3
     last_error = None
+    client = get_http_client("groq")
+    governor = get_governor("groq")
+    breaker = get_breaker("groq")
+    estimated_tokens = count_message_tokens(messages) + ESTIMATED_COMPLETION_TOKENS
+    retry_after = None
     
     for attempt in range(max_retries):
+        if attempt:
+            delay = backoff_delay(attempt - 1, retry_after)
+            if not can_wait(delay, "generation"):
+                last_error = DeadlineExceeded("generation")
+                break
+            time.sleep(delay)
+            retry_after = None
         try:
-            url = "https://api.groq.com/openai/v1/chat/completions"
+            url = f"{GROQ_BASE_URL}/openai/v1/chat/completions"
             headers = {
                 "Authorization": f"Bearer {api_key}", 
                 "Content-Type": "application/json"
@@ -86,15 +162,33 @@ def ask_groq(messages: list, model: str, temperature: float):
                 "temperature": temperature
             }
             
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
+            def send():
+                governor.acquire(tokens=estimated_tokens)
+                response = client.post(url, headers=headers, json=data, timeout=http_timeout("generation"))
+                response.raise_for_status()
+                return response.json()
             
-            response_json = response.json()
+            response_json = breaker.call(send)
+            governor.record_usage(estimated_tokens, response_json.get("usage", {}).get("total_tokens"))
             message_content = response_json["choices"][0]["message"]["content"]
+            response_cache.set(cache_key, message_content)
             return message_content
             
+        except (RateLimitTimeout, CircuitOpenError) as e:
+            last_error = e
+            break
+        except httpx.HTTPStatusError as e:
+            last_error = e
+            if e.response.status_code not in RETRYABLE_STATUS_CODES:
+                break
+            retry_after = retry_after_seconds(e.response)
         except Exception as e:
             last_error = e
             continue
             
-    return f"Error querying Groq API after {max_retries} attempts: {last_error}"
+    # Groq is down or saturated: an expired answer to the same prompt beats an error
+    stale = response_cache.get(cache_key, allow_expired=True)
+    if stale is not None:
+        print(f"Serving expired cached answer while Groq is unavailable: {last_error}")
+        return stale
+    return f"Error querying Groq API: {last_error}"
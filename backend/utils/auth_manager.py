@@ -1,14 +1,14 @@
-import sqlite3
 import bcrypt
 import os
 import streamlit as st
 from datetime import datetime
+from utils.sqlite_pool import get_connection
 
 DB_PATH = "users.db"
 
 def init_db():
     """Initialize the SQLite database for users."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -39,7 +39,7 @@ def verify_password(password, hashed):
 
 def register_user(email, password=None, google_id=None, full_name=None):
     """Register a new user."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     
     try:
@@ -63,7 +63,7 @@ def register_user(email, password=None, google_id=None, full_name=None):
 
 def login_user(email, password):
     """Authenticate a user."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     
     c.execute("SELECT password, full_name FROM users WHERE email = ?", (email,))
@@ -77,7 +77,7 @@ def login_user(email, password):
 
 def has_password(email):
     """Checks if the user has a password set."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     c.execute("SELECT password FROM users WHERE email = ?", (email,))
     result = c.fetchone()
@@ -86,7 +86,7 @@ def has_password(email):
 
 def user_exists(email):
     """Checks if a user already exists."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     c.execute("SELECT email FROM users WHERE email = ?", (email,))
     result = c.fetchone()
@@ -95,7 +95,7 @@ def user_exists(email):
 
 def update_password(email, new_password):
     """Updates the user's password."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     hashed_pw = hash_password(new_password)
     try:
@@ -109,7 +109,7 @@ def update_password(email, new_password):
 
 def login_google_user(email, google_id, full_name=None):
     """Authenticate or register a Google user."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     
     c.execute("SELECT google_id, full_name FROM users WHERE email = ?", (email,))
@@ -144,7 +144,7 @@ def login_google_user(email, google_id, full_name=None):
 
 def delete_user(email):
     """Delete a user account."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     c.execute("DELETE FROM users WHERE email = ?", (email,))
     conn.commit()
@@ -164,7 +164,7 @@ def logout_user():
 
 def get_user_name(email):
     """Fetches full name for a user."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     c.execute("SELECT full_name FROM users WHERE email = ?", (email,))
     result = c.fetchone()
@@ -173,7 +173,7 @@ def get_user_name(email):
 
 def update_user_name(email, full_name):
     """Updates the user's full name."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     c = conn.cursor()
     try:
         c.execute("UPDATE users SET full_name = ? WHERE email = ?", (full_name, email))
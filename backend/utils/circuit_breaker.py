@@ -0,0 +1,237 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+import httpx
+from utils.executors import HEDGE_EXECUTOR, submit_in_context
+from utils.deadline import DeadlineExceeded, BudgetSpent, UPSTREAM_TIMEOUT_SECONDS
+
+# Per-provider circuit breakers. After FAILURE_THRESHOLD consecutive provider
+# failures (timeouts, connection errors, 5xx) the circuit opens and calls fail
+# immediately with CircuitOpenError, so callers can fall back (skip web search,
+# serve a cached answer) instead of waiting out timeouts. After RECOVERY_TIMEOUT
+# one probe call is let through; its outcome closes or re-opens the circuit.
+
+FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+RECOVERY_TIMEOUT_SECONDS = float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30"))
+
+# A half-open probe that hasn't reported back by then (its task was cancelled, or a
+# stream was never started) is treated as lost and the next caller becomes the probe
+PROBE_TIMEOUT_SECONDS = float(os.getenv("BREAKER_PROBE_TIMEOUT", str(UPSTREAM_TIMEOUT_SECONDS)))
+
+# Hedged requests: if a call is still running at the provider's p95 latency, a
+# second identical attempt is started and whichever finishes first wins.
+# Off by default since a hedge can double upstream cost.
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0") == "1"
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} is temporarily unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+def is_provider_failure(error) -> bool:
+    """
+    True if an exception means the provider is unhealthy (as opposed to a bad
+    request, a rate limit or an unparseable answer).
+    """
+    # BudgetSpent: our own pipeline used up the deadline before the call was made
+    if isinstance(error, BudgetSpent):
+        return False
+    # DeadlineExceeded: the call outlived a real stage budget (run_stage / iterate_stage) - a hung provider
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError, DeadlineExceeded)):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    # Provider SDK errors (groq.APIConnectionError, groq.APITimeoutError) carry no status
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a latency window for hedging."""
+    def __init__(self, provider, failure_threshold=FAILURE_THRESHOLD, recovery_timeout=RECOVERY_TIMEOUT_SECONDS,
+                 probe_timeout=PROBE_TIMEOUT_SECONDS):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe_timeout = probe_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (doesn't claim the half-open probe)."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at < self.recovery_timeout
+            return self.state == HALF_OPEN and self._probe_in_flight and not self._probe_lost()
+
+    def _probe_lost(self):
+        # Caller holds self._lock
+        return time.monotonic() - self._probe_started >= self.probe_timeout
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a probe through."""
+        with self._lock:
+            return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now. In half-open state only one probe is allowed."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and (not self._probe_in_flight or self._probe_lost()):
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+                return True
+            return False
+
+    def record_success(self, latency=None):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"{self.provider} circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"{self.provider} circuit opened after {self.failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def hedge_delay(self):
+        """p95 of recent successful call latencies, or None if there aren't enough samples."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def _check(self):
+        if not self.allow_request():
+            raise CircuitOpenError(self.provider, self.retry_after())
+
+    def record_error(self, error):
+        """Counts an exception against the provider only if it means the provider is unhealthy."""
+        if is_provider_failure(error):
+            self.record_failure()
+        else:
+            # Bad request, parse failure, our own rate limiting: no verdict on the provider
+            self.release()
+
+    def release(self):
+        """Gives back a claimed half-open probe without a verdict (no-op otherwise)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def call(self, func, hedge=HEDGE_REQUESTS):
+        """
+        Runs a blocking upstream call through the breaker.
+
+        Input:
+            func: Zero-argument callable making the request (must be safe to run twice if hedging).
+            hedge (bool): Start a second attempt once the first passes the p95 latency.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open.
+        """
+        self._check()
+        start = time.monotonic()
+        try:
+            result = self._hedged(func) if hedge else func()
+        except BaseException as e:
+            # Includes CancelledError: a cancelled probe must still be given back
+            self.record_error(e)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    async def acall(self, coro_func, hedge=HEDGE_REQUESTS):
+        """Async version of call(); coro_func is a zero-argument coroutine function."""
+        self._check()
+        start = time.monotonic()
+        try:
+            result = await (self._ahedged(coro_func) if hedge else coro_func())
+        except BaseException as e:
+            # Includes CancelledError: a cancelled probe must still be given back
+            self.record_error(e)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def _hedged(self, func):
+        delay = self.hedge_delay()
+        if delay is None:
+            return func()
+        pending = {submit_in_context(HEDGE_EXECUTOR, func)}
+        done, _ = wait(pending, timeout=delay)
+        if not done:
+            pending.add(submit_in_context(HEDGE_EXECUTOR, func))
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _ahedged(self, coro_func):
+        delay = self.hedge_delay()
+        if delay is None:
+            return await coro_func()
+        pending = {asyncio.ensure_future(coro_func())}
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            pending.add(asyncio.ensure_future(coro_func()))
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Returns the shared circuit breaker for a provider ('groq' or 'tavily')."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider)
+            _breakers[provider] = breaker
+        return breaker
@@ -9,6 +9,7 @@ class RetrievalStrategy(str, Enum):
     
     # Vector-Based
     VECTOR = "Vector Retriever"
+    VECTOR_BASED = "Vector Retriever" # Alias of VECTOR, used by the router prompts
     VECTOR_CYPHER = "Vector Cypher Retriever"
     EMBEDDING = "Embedding-Based Retriever"
     
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import weakref
+from datetime import datetime
+from utils.sqlite_pool import get_connection
+from utils.database import DB_FILE
+from utils.prompt_loader import load_prompt
+from utils.upstream_clients import get_groq_chat
+from utils.executors import run_db
+from utils.rate_limiter import get_governor, ESTIMATED_COMPLETION_TOKENS
+from utils.text_utils import count_tokens
+from utils.deadline import set_deadline
+
+# Turns kept verbatim in the prompt; anything older is folded into the running summary
+RECENT_TURNS = 4
+
+# Older turns are folded once at least this many have built up, so a long conversation
+# costs one summary call per SUMMARY_BATCH_TURNS turns rather than one per turn
+SUMMARY_BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "4"))
+
+# Small, fast model is plenty for summarisation
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+SUMMARY_MAX_WORDS = 250
+
+# One summariser at a time per conversation, so two background tasks can't fold the same turns.
+# Weak values: a conversation's lock is dropped once no task is holding or waiting on it.
+_locks = weakref.WeakValueDictionary()
+
+def get_summary(conversation_id: str):
+    """
+    Returns the stored summary for a conversation.
+
+    Output:
+        tuple: (summary text or "", id of the last interaction folded into it or 0)
+    """
+    conn = get_connection(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute("SELECT summary, last_interaction_id FROM conversation_summaries WHERE conversation_id = ?", (conversation_id,))
+    row = cursor.fetchone()
+    conn.close()
+    if not row:
+        return "", 0
+    return row[0] or "", row[1] or 0
+
+def save_summary(conversation_id: str, summary: str, last_interaction_id: int):
+    """Stores (or replaces) the running summary for a conversation."""
+    conn = get_connection(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT OR REPLACE INTO conversation_summaries (conversation_id, summary, last_interaction_id, updated_at) VALUES (?, ?, ?, ?)",
+        (conversation_id, summary, last_interaction_id, datetime.now())
+    )
+    conn.commit()
+    conn.close()
+
+def delete_summary(conversation_id: str):
+    """Removes a conversation's summary (when the conversation is deleted)."""
+    conn = get_connection(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM conversation_summaries WHERE conversation_id = ?", (conversation_id,))
+    conn.commit()
+    conn.close()
+
+def get_unsummarized_turns(conversation_id: str, after_id: int, limit: int = None):
+    """
+    Returns turns not yet folded into the summary, oldest first.
+
+    Output:
+        list: (interaction_id, user_prompt, llm_response) tuples.
+    """
+    conn = get_connection(DB_FILE)
+    cursor = conn.cursor()
+    query = "SELECT id, user_prompt, llm_response FROM interactions WHERE conversation_id = ? AND id > ? ORDER BY id DESC"
+    params = [conversation_id, after_id]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return [(row[0], row[1], row[2] or "") for row in reversed(rows)]
+
+def load_history_with_summary(conversation_id: str, limit: int = 50):
+    """
+    Loads what a prompt needs from a conversation: the running summary plus the
+    turns after it. Once the summariser has caught up that is fewer than
+    RECENT_TURNS + SUMMARY_BATCH_TURNS turns, however long the conversation is.
+
+    Output:
+        tuple: (summary, [(user_prompt, llm_response), ...] oldest first)
+    """
+    summary, last_id = get_summary(conversation_id)
+    turns = get_unsummarized_turns(conversation_id, last_id, limit)
+    return summary, [(user, assistant) for _, user, assistant in turns]
+
+async def update_conversation_summary(conversation_id: str):
+    """
+    Folds turns older than the most recent RECENT_TURNS into the stored summary, once
+    at least SUMMARY_BATCH_TURNS of them have built up. Meant to run as a background
+    task after the response has been sent.
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key or not conversation_id:
+        return
+
+    # Background tasks inherit the request's context; the request's deadline doesn't apply here
+    set_deadline(None)
+
+    lock = _locks.get(conversation_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _locks[conversation_id] = lock
+    async with lock:
+        summary, last_id = await run_db(get_summary, conversation_id)
+        turns = await run_db(get_unsummarized_turns, conversation_id, last_id)
+
+        to_fold = turns[:-RECENT_TURNS] if len(turns) > RECENT_TURNS else []
+        if len(to_fold) < max(SUMMARY_BATCH_TURNS, 1):
+            return
+
+        turns_text = "\n\n".join(f"User: {user}\nAssistant: {assistant}" for _, user, assistant in to_fold)
+        prompt = load_prompt("conversation_summary.txt").format(
+            max_words=SUMMARY_MAX_WORDS,
+            summary=summary or "(none yet)",
+            turns=turns_text
+        )
+
+        try:
+            # Summaries are background work: queue behind the rate limit like everything else
+            await get_governor("groq").aacquire(tokens=count_tokens(prompt) + ESTIMATED_COMPLETION_TOKENS)
+            llm = get_groq_chat(api_key, SUMMARY_MODEL, 0)
+            response = await llm.ainvoke([{"role": "user", "content": prompt}])
+        except Exception as e:
+            # Summary just stays behind; the unfolded turns are still sent verbatim
+            print(f"Conversation summary failed for {conversation_id}: {e}")
+            return
+
+        await run_db(save_summary, conversation_id, response.content.strip(), to_fold[-1][0])
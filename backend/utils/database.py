@@ -1,4 +1,6 @@
 import sqlite3
+from utils.sqlite_pool import get_connection
+from utils.migrations import migrate
 import json
 import os
 import uuid
@@ -9,7 +11,7 @@ DB_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data",
 def setup_database():
     """Create the database and tables, with all necessary columns for persistence."""
     os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     
     # Interactions Table
@@ -51,10 +53,11 @@ def setup_database():
         
     conn.commit()
     conn.close()
+    migrate(DB_FILE)
 
 def create_conversation(title: str, user_id: str):
     """Creates a new conversation and returns its ID."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     conv_id = str(uuid.uuid4())
     cursor.execute(
@@ -68,7 +71,7 @@ def create_conversation(title: str, user_id: str):
 def get_conversations(user_id: str, limit: int = 50):
     """Retrieves recent conversations for a specific user."""
     if not os.path.exists(DB_FILE): return []
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM conversations WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit))
@@ -77,17 +80,18 @@ def get_conversations(user_id: str, limit: int = 50):
     return [dict(row) for row in rows]
 
 def delete_conversation(conversation_id: str):
-    """Deletes a conversation and its interactions."""
-    conn = sqlite3.connect(DB_FILE)
+    """Deletes a conversation, its interactions and its running summary."""
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
     cursor.execute("DELETE FROM interactions WHERE conversation_id = ?", (conversation_id,))
+    cursor.execute("DELETE FROM conversation_summaries WHERE conversation_id = ?", (conversation_id,))
     conn.commit()
     conn.close()
 
 def delete_all_user_conversations(user_id: str):
     """Deletes ALL conversations for a specific user."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     # Get all conversation IDs for this user first (to delete interactions)
     cursor.execute("SELECT id FROM conversations WHERE user_id = ?", (user_id,))
@@ -99,6 +103,7 @@ def delete_all_user_conversations(user_id: str):
         # Delete interactions (batch delete)
         placeholders = ','.join(['?'] * len(conv_ids))
         cursor.execute(f"DELETE FROM interactions WHERE conversation_id IN ({placeholders})", conv_ids)
+        cursor.execute(f"DELETE FROM conversation_summaries WHERE conversation_id IN ({placeholders})", conv_ids)
         
     conn.commit()
     conn.close()
@@ -106,7 +111,7 @@ def delete_all_user_conversations(user_id: str):
 def get_dashboard_stats(user_id: str):
     """Aggregates dashboard statistics for a specific user."""
     if not os.path.exists(DB_FILE): return {}
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -157,7 +162,7 @@ def get_dashboard_stats(user_id: str):
 
 def rename_conversation(conversation_id: str, new_title: str):
     """Renames a conversation."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     cursor.execute("UPDATE conversations SET title = ? WHERE id = ?", (new_title, conversation_id))
     conn.commit()
@@ -165,7 +170,7 @@ def rename_conversation(conversation_id: str, new_title: str):
 
 def log_interaction(user_prompt: str, web_context: str, llm_response: str, source: str, sources: list, conversation_id: str = None):
     """Logs a complete user interaction to the database and returns its ID."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     sources_json = json.dumps(sources)
     cursor.execute(
@@ -179,7 +184,7 @@ def log_interaction(user_prompt: str, web_context: str, llm_response: str, sourc
 
 def update_interaction_rating(interaction_id: int, rating: int):
     """Updates the rating for a specific interaction."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     cursor.execute("UPDATE interactions SET rating = ? WHERE id = ?", (rating, interaction_id))
     conn.commit()
@@ -188,7 +193,7 @@ def update_interaction_rating(interaction_id: int, rating: int):
 def get_rated_interactions(user_id: str):
     """Retrieves all rated interactions (memories) for a user (positive and negative)."""
     if not os.path.exists(DB_FILE): return []
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     cursor.execute("""
@@ -204,7 +209,7 @@ def get_rated_interactions(user_id: str):
 
 def delete_individual_interaction(interaction_id: int):
     """Deletes a specific interaction (memory)."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     cursor.execute("DELETE FROM interactions WHERE id = ?", (interaction_id,))
     conn.commit()
@@ -212,7 +217,7 @@ def delete_individual_interaction(interaction_id: int):
 
 def find_similar_interaction(query: str):
     """Finds a similar, highly-rated past interaction (Positive)."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     cursor.execute(
@@ -233,7 +238,7 @@ def find_similar_interaction(query: str):
 
 def find_similar_negative_interaction(query: str):
     """Finds a similar, negatively-rated past interaction (Avoidance)."""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     cursor.execute(
@@ -260,7 +265,7 @@ def load_chat_history_from_db(conversation_id: str = None, limit: int = 50):
     if not conversation_id:
         return []
 
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -284,7 +289,7 @@ def load_chat_history_from_db(conversation_id: str = None, limit: int = 50):
 def load_query_history_from_db(limit: int = 10):
     """Loads the last N user prompts from the DB for the dashboard."""
     if not os.path.exists(DB_FILE): return []
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     cursor = conn.cursor()
     cursor.execute("SELECT user_prompt FROM interactions ORDER BY timestamp DESC LIMIT ?", (limit,))
     rows = cursor.fetchall()
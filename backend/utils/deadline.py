@@ -0,0 +1,134 @@
+import asyncio
+import contextvars
+import os
+import time
+import httpx
+
+# Request-scoped deadlines. A chat request starts one (start_deadline) and every
+# stage below it - routing, retrieval, web search, generation - sizes its
+# timeouts from what is left, instead of each using its own fixed timeout.
+# Lives in a contextvar so it follows the request through awaits; executor
+# helpers (utils/executors.py) copy the context into worker threads.
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+
+# Ceiling for any single upstream HTTP call, deadline or not
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT", "60"))
+CONNECT_TIMEOUT_SECONDS = 5.0
+
+# Share of the *remaining* budget each stage may use. Generation runs last and gets the rest.
+STAGE_SHARES = {
+    "routing": 0.25,
+    "retrieval": 0.2,
+    "web_search": 0.35,
+    "draft": 0.4, # Small-model cascade draft; escalation still needs time for generation
+    "generation": 1.0,
+}
+
+# Below this many seconds a stage is skipped rather than started
+MIN_STAGE_SECONDS = 0.5
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage runs out of its share of the request deadline."""
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+class BudgetSpent(DeadlineExceeded):
+    """
+    Raised instead of starting a stage whose budget is already below MIN_STAGE_SECONDS:
+    earlier stages (or queueing for rate-limit capacity) used up the time, so the
+    upstream was never called and says nothing about its health.
+    """
+    def __init__(self, stage):
+        Exception.__init__(self, f"No time left for {stage}")
+        self.stage = stage
+
+def start_deadline(seconds=REQUEST_DEADLINE_SECONDS):
+    """Starts a deadline `seconds` from now for the current context. Returns a token for reset_deadline()."""
+    return _deadline.set(time.monotonic() + seconds)
+
+def set_deadline(deadline):
+    """Adopts an absolute (time.monotonic) deadline captured elsewhere, e.g. in a streaming generator."""
+    return _deadline.set(deadline)
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+def current_deadline():
+    """The absolute deadline (time.monotonic), or None if no request deadline is set."""
+    return _deadline.get()
+
+def remaining():
+    """Seconds left before the deadline (may be negative), or None if there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def stage_timeout(stage, ceiling=UPSTREAM_TIMEOUT_SECONDS):
+    """
+    Time budget for a stage: its share of what's left, capped at `ceiling`.
+    Without a request deadline the ceiling alone applies.
+    """
+    left = remaining()
+    if left is None:
+        return ceiling
+    return max(0.0, min(ceiling, left * STAGE_SHARES.get(stage, 1.0)))
+
+def has_time_for(stage) -> bool:
+    """False when the stage's budget is too small to be worth starting (degrade instead)."""
+    return stage_timeout(stage) >= MIN_STAGE_SECONDS
+
+def can_wait(delay, stage) -> bool:
+    """True if sleeping `delay` seconds (e.g. a retry backoff) still leaves the stage time to run."""
+    left = remaining()
+    if left is None:
+        return True
+    return (left - delay) * STAGE_SHARES.get(stage, 1.0) >= MIN_STAGE_SECONDS
+
+def http_timeout(stage) -> httpx.Timeout:
+    """httpx timeout for one upstream call within a stage."""
+    budget = max(stage_timeout(stage), 0.1)
+    return httpx.Timeout(budget, connect=min(CONNECT_TIMEOUT_SECONDS, budget))
+
+async def run_stage(stage, awaitable):
+    """
+    Awaits `awaitable` within the stage's budget.
+
+    Raises:
+        BudgetSpent: If the stage has no real budget left (the awaitable isn't started).
+        DeadlineExceeded: If it doesn't finish in time (the awaitable is cancelled).
+    """
+    if not has_time_for(stage):
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise BudgetSpent(stage)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=stage_timeout(stage))
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(stage)
+
+async def iterate_stage(stage, aiterable):
+    """
+    Async-iterates `aiterable` (e.g. a token stream) with the whole iteration bounded
+    by the stage's budget.
+
+    Raises:
+        BudgetSpent: If the stage has no real budget left (nothing is requested).
+        DeadlineExceeded: If the stream hasn't finished in time.
+    """
+    if not has_time_for(stage):
+        raise BudgetSpent(stage)
+    stage_deadline = time.monotonic() + stage_timeout(stage)
+    iterator = aiterable.__aiter__()
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), timeout=max(0.0, stage_deadline - time.monotonic()))
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage)
+        yield item
@@ -4,6 +4,14 @@ import pandas as pd
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, UnstructuredExcelLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from utils.text_utils import count_tokens
+
+# File types the loaders below know how to handle
+SUPPORTED_EXTENSIONS = [".pdf", ".docx", ".xlsx", ".xls", ".txt"]
+
+# Chunk sizes are measured in tokens so chunks map predictably onto prompt budgets
+CHUNK_SIZE_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 50
 
 def process_uploaded_file(uploaded_file):
     """
@@ -18,6 +26,19 @@ def process_uploaded_file(uploaded_file):
     if uploaded_file is None:
         return []
 
+    documents = load_documents(uploaded_file)
+    return split_documents(documents, uploaded_file.name)
+
+def load_documents(uploaded_file):
+    """
+    Parses an uploaded file into unsplit LangChain Documents (one per page where the format has pages).
+    
+    Input:
+        uploaded_file (UploadedFile): Any object with .name and .getvalue().
+        
+    Output:
+        list: A list of LangChain Document objects.
+    """
     file_extension = os.path.splitext(uploaded_file.name)[1].lower()
     documents = []
 
@@ -63,20 +84,33 @@ def process_uploaded_file(uploaded_file):
         if os.path.exists(tmp_file_path):
             os.remove(tmp_file_path)
 
+    return documents
+
+def split_documents(documents, file_name):
+    """
+    Splits parsed Documents into chunks and tags each chunk with its source file.
+    
+    Input:
+        documents (list): Documents returned by load_documents.
+        file_name (str): Name of the originating file.
+        
+    Output:
+        list: A list of chunked LangChain Document objects.
+    """
     # Split text if we have documents
     if documents:
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
+            chunk_size=CHUNK_SIZE_TOKENS,
+            chunk_overlap=CHUNK_OVERLAP_TOKENS,
+            length_function=count_tokens,
         )
         split_docs = text_splitter.split_documents(documents)
         # Ensure source metadata is preserved/set
         for doc in split_docs:
             if "source" not in doc.metadata:
-                doc.metadata["source"] = uploaded_file.name
+                doc.metadata["source"] = file_name
             else:
-                doc.metadata["source"] = f"{uploaded_file.name} - {doc.metadata.get('source', '')}"
+                doc.metadata["source"] = f"{file_name} - {doc.metadata.get('source', '')}"
         return split_docs
     
     return []
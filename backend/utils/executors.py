@@ -0,0 +1,50 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Dedicated pools so blocking work in async handlers never holds the event loop
+# or FastAPI's shared threadpool. FAISS and the embedding model release the GIL,
+# so threads are enough for the CPU-bound side.
+CPU_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CPU_WORKERS", os.cpu_count() or 4)),
+    thread_name_prefix="cpu"
+)
+DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DB_WORKERS", "8")),
+    thread_name_prefix="db"
+)
+# Blocking upstream HTTP calls made from sync code (the Streamlit app)
+UPSTREAM_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPSTREAM_WORKERS", "16")),
+    thread_name_prefix="upstream"
+)
+
+# Hedged upstream attempts (see utils/circuit_breaker.py); separate so a hedge never queues behind its own caller
+HEDGE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("HEDGE_WORKERS", "8")),
+    thread_name_prefix="hedge"
+)
+
+async def run_cpu(func, *args, **kwargs):
+    """Runs CPU-bound work (vector search, embeddings) on the CPU executor."""
+    loop = asyncio.get_running_loop()
+    # Copy the context so request-scoped state (the deadline) is visible in the worker
+    return await loop.run_in_executor(CPU_EXECUTOR, contextvars.copy_context().run, partial(func, *args, **kwargs))
+
+async def run_db(func, *args, **kwargs):
+    """Runs a blocking SQLite call on the DB executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(DB_EXECUTOR, contextvars.copy_context().run, partial(func, *args, **kwargs))
+
+def submit_in_context(executor, func, *args, **kwargs):
+    """executor.submit() that carries the caller's context (the request deadline) into the worker."""
+    return executor.submit(contextvars.copy_context().run, partial(func, *args, **kwargs))
+
+def shutdown_executors():
+    """Stops all pools. Called on application shutdown."""
+    CPU_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    DB_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    UPSTREAM_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    HEDGE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,210 @@
+import atexit
+import json
+import os
+import re
+import threading
+import numpy as np
+from utils.constants import RetrievalStrategy
+
+# Cheap, local routing tier that runs before the LLM router. It only answers when
+# it is confident; otherwise it returns None and the LLM decides.
+
+URL_PATTERN = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
+
+# Squared L2 distances between normalised MiniLM embeddings (0 = identical, 2 = opposite).
+# Below DOC_MATCH_DISTANCE the best document chunk is clearly on topic; above
+# DOC_MISS_DISTANCE the uploaded documents are clearly irrelevant.
+DOC_MATCH_DISTANCE = 0.8
+DOC_MISS_DISTANCE = 1.4
+
+# kNN classifier over past LLM routing decisions
+ROUTER_EXAMPLES_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "router_examples.json"))
+CLASSIFIER_K = 5
+CLASSIFIER_MIN_EXAMPLES = 20
+CLASSIFIER_MIN_AGREEMENT = 0.8
+CLASSIFIER_MAX_DISTANCE = 0.8
+MAX_EXAMPLES = 2000
+
+# New examples are kept in memory and written out once this many have built up (and on exit)
+ROUTER_EXAMPLES_SAVE_EVERY = int(os.getenv("ROUTER_EXAMPLES_SAVE_EVERY", "20"))
+
+class RouterClassifier:
+    """
+    Nearest-neighbour strategy classifier trained on the LLM router's past decisions.
+    Examples are persisted as JSON (query + strategy) in batches and embedded lazily.
+    """
+    def __init__(self, path=ROUTER_EXAMPLES_FILE, save_every=ROUTER_EXAMPLES_SAVE_EVERY):
+        self.path = path
+        self.save_every = save_every
+        self.examples = []
+        self.vectors = None # Embeddings of the first len(self.vectors) examples
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.examples = json.load(f)
+            except (OSError, ValueError):
+                self.examples = []
+
+    def _ensure_vectors(self, embeddings):
+        # Caller holds self._lock. Only examples added without a vector are embedded.
+        embedded = 0 if self.vectors is None else len(self.vectors)
+        texts = [e["query"] for e in self.examples[embedded:]]
+        if not texts:
+            return
+        vectors = np.array(embeddings.embed_documents(texts), dtype="float32")
+        self.vectors = vectors if not embedded else np.vstack([self.vectors, vectors])
+
+    def add_example(self, query, strategy, query_vector=None):
+        """
+        Records an LLM routing decision as a training example. It's kept in memory and
+        written to disk with the next batch (see flush()).
+
+        Input:
+            query (str): The user's query.
+            strategy (str): The strategy the LLM router chose.
+            query_vector (list): The query's embedding, if already computed (saves embedding it later).
+        """
+        with self._lock:
+            if query_vector is not None and self.vectors is not None and len(self.vectors) == len(self.examples):
+                self.vectors = np.vstack([self.vectors, np.array([query_vector], dtype="float32")])
+            self.examples.append({"query": query, "strategy": strategy})
+            if len(self.examples) > MAX_EXAMPLES:
+                drop = len(self.examples) - MAX_EXAMPLES
+                self.examples = self.examples[drop:]
+                if self.vectors is not None:
+                    self.vectors = self.vectors[drop:] if len(self.vectors) > drop else None
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Writes the examples to disk if any are unsaved, atomically (temp file, then rename)."""
+        # Snapshots are taken in save order, so an older snapshot never overwrites a newer one
+        with self._save_lock:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                examples = list(self.examples)
+                unsaved, self._unsaved = self._unsaved, 0
+            tmp_path = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w") as f:
+                    json.dump(examples, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Failed to save router examples: {e}")
+                with self._lock:
+                    self._unsaved += unsaved
+
+    def predict(self, query_vector, embeddings, allowed=None):
+        """
+        Input:
+            query_vector (list): Embedding of the query.
+            embeddings: Embeddings model (used to embed stored examples on first use).
+            allowed (set): Optional set of strategies that may be returned.
+
+        Output:
+            tuple or None: (strategy, agreement, nearest_distance) if confident, else None.
+        """
+        with self._lock:
+            if len(self.examples) < CLASSIFIER_MIN_EXAMPLES:
+                return None
+            self._ensure_vectors(embeddings)
+            vectors = self.vectors
+            strategies = [e["strategy"] for e in self.examples]
+
+        distances = ((vectors - np.array(query_vector, dtype="float32")) ** 2).sum(axis=1)
+        nearest = np.argsort(distances)[:CLASSIFIER_K]
+        if distances[nearest[0]] > CLASSIFIER_MAX_DISTANCE:
+            return None
+
+        votes = {}
+        for i in nearest:
+            votes[strategies[i]] = votes.get(strategies[i], 0) + 1
+        strategy, count = max(votes.items(), key=lambda item: item[1])
+        agreement = count / len(nearest)
+        if agreement < CLASSIFIER_MIN_AGREEMENT:
+            return None
+        if allowed is not None and strategy not in allowed:
+            return None
+        return strategy, agreement, float(distances[nearest[0]])
+
+router_classifier = RouterClassifier()
+atexit.register(router_classifier.flush)
+
+def _decision(query, strategy, reasoning, context_source, confidence, **extra):
+    decision = {
+        "strategy": strategy,
+        "reasoning": reasoning,
+        "refined_query": query,
+        "context_source": context_source,
+        "confidence_score": confidence,
+        "clarification_needed": False,
+        "router": "local"
+    }
+    decision.update(extra)
+    return decision
+
+def route_locally(user_query, vector_store_manager=None, query_vector=None):
+    """
+    Tries to route a query without an LLM call.
+
+    Signals, cheapest first: URLs in the query, whether any documents are indexed,
+    the best document-match distance, and a kNN classifier over past LLM decisions.
+
+    Input:
+        user_query (str): The user's message.
+        vector_store_manager (VectorStoreManager): Session store (optional; without it only the URL check runs).
+        query_vector (list): Precomputed embedding of the query (optional).
+
+    Output:
+        dict or None: A decision in the same shape as get_retriever_decision, or None if not confident.
+    """
+    urls = re.findall(URL_PATTERN, user_query)
+    if urls:
+        return _decision(
+            user_query, RetrievalStrategy.WEB_SEARCH.value,
+            f"User query contains specific URLs: {urls}. Switching to Web Search.",
+            "general_knowledge", 10, urls=urls
+        )
+
+    if vector_store_manager is None:
+        return None
+
+    embeddings = vector_store_manager.get_embeddings()
+    if query_vector is None:
+        query_vector = embeddings.embed_query(user_query)
+
+    has_documents = vector_store_manager.vector_store is not None
+    if has_documents:
+        matches = vector_store_manager.vector_store.similarity_search_with_score_by_vector(query_vector, k=1)
+        if matches:
+            distance = matches[0][1]
+            if distance < DOC_MATCH_DISTANCE:
+                return _decision(
+                    user_query, RetrievalStrategy.VECTOR.value,
+                    f"Uploaded documents closely match the query (distance {distance:.2f}).",
+                    "document", 9
+                )
+            # In between the thresholds the documents might be relevant; leave it to the LLM
+            if distance <= DOC_MISS_DISTANCE:
+                return None
+
+    # No (relevant) documents: only non-document strategies are candidates
+    allowed = {RetrievalStrategy.DIRECT_LLM.value, RetrievalStrategy.WEB_SEARCH.value}
+    prediction = router_classifier.predict(query_vector, embeddings, allowed=allowed)
+    if prediction is None:
+        return None
+
+    strategy, agreement, distance = prediction
+    reason = "No documents are indexed." if not has_documents else "Uploaded documents don't match the query."
+    return _decision(
+        user_query, strategy,
+        f"{reason} Similar past queries were routed to {strategy} ({agreement:.0%} agreement).",
+        "general_knowledge", 8
+    )
@@ -32,3 +32,16 @@ def log_llm_call(provider: str, model: str, prompt_tokens: int = 0, response_tok
     st.session_state.llm_model_usage[model] = st.session_state.llm_model_usage.get(model, 0) + 1
     st.session_state.token_count += prompt_tokens + response_tokens
     save_stats()
+
+def log_routing(router: str):
+    """
+    Counts which routing tier decided a turn, so the dashboard can show how often the LLM router is skipped.
+    
+    Input:
+        router (str): 'cache' or 'local' for the fast path, 'llm' for the LLM router.
+    """
+    if router == "llm":
+        st.session_state.router_llm_count += 1
+    else:
+        st.session_state.router_local_count += 1
+    save_stats()
@@ -0,0 +1,138 @@
+from utils.sqlite_pool import get_connection
+
+# Versioned schema changes for interactions.db, tracked with PRAGMA user_version.
+# The base tables are created by init_dbs.py / database.setup_database; steps here
+# run once each, in order, inside a transaction. Append new steps - never edit or
+# reorder ones that have shipped.
+
+def add_column(cursor, table, column, declaration):
+    """ALTER TABLE ADD COLUMN, skipped if an older ad-hoc migration already added it."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [info[1] for info in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def add_pinning(cursor):
+    # Previously only added by migrate_pinned.py
+    add_column(cursor, "conversations", "is_pinned", "INTEGER DEFAULT 0")
+
+def add_feedback(cursor):
+    # Previously only added by migrate_db.py / the feedback router
+    add_column(cursor, "interactions", "feedback", "TEXT")
+
+def add_hot_path_indexes(cursor):
+    # History loads: WHERE conversation_id = ? ORDER BY timestamp (also covers the dashboard joins and counts)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_conversation_time ON interactions(conversation_id, timestamp)")
+    # Unsummarised turns: WHERE conversation_id = ? AND id > ? ORDER BY id (index ends in rowid = id)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_conversation ON interactions(conversation_id)")
+    # Conversation list: WHERE user_id = ? ORDER BY is_pinned DESC, created_at DESC (covers the per-user counts)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_user_pinned_created ON conversations(user_id, is_pinned, created_at)")
+    # Rated memories: WHERE rating >= 1 ORDER BY rating, timestamp (and rating <= -1)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_rating ON interactions(rating, timestamp)")
+    # Recent queries sidebar: ORDER BY timestamp DESC LIMIT n
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON interactions(timestamp)")
+
+def add_conversation_summaries(cursor):
+    # Rolling summary of turns that have scrolled out of the prompt window
+    # (previously created ad hoc by init_dbs.py, hence IF NOT EXISTS)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            conversation_id TEXT PRIMARY KEY,
+            summary TEXT,
+            last_interaction_id INTEGER DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Drop summaries left behind by conversations deleted before deletes covered them
+    cursor.execute("DELETE FROM conversation_summaries WHERE conversation_id NOT IN (SELECT id FROM conversations)")
+
+INTERACTIONS_MIGRATIONS = [
+    (1, "conversations.is_pinned", add_pinning),
+    (2, "interactions.feedback", add_feedback),
+    (3, "indexes for history, conversation list, ratings and recent queries", add_hot_path_indexes),
+    (4, "conversation_summaries", add_conversation_summaries),
+]
+
+def migrate(db_path, migrations=INTERACTIONS_MIGRATIONS):
+    """
+    Applies every migration newer than the database's user_version.
+
+    Input:
+        db_path (str): SQLite database file (base tables must already exist).
+        migrations (list): (version, description, step) tuples; step takes a cursor.
+
+    Output:
+        int: The schema version after migrating.
+    """
+    conn = get_connection(db_path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, description, step in migrations:
+            if target <= version:
+                continue
+            print(f"Migrating {db_path} to schema v{target}: {description}")
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                step(cursor)
+                cursor.execute(f"PRAGMA user_version = {int(target)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            version = target
+        return version
+    finally:
+        conn.close()
+
+# Hot queries and the index each must use. sorted_by_index: the ORDER BY must come
+# from the index (no temp B-tree), so loading a page stays O(log n) as tables grow.
+HOT_QUERIES = [
+    ("chat history", "SELECT * FROM interactions WHERE conversation_id = ? ORDER BY timestamp ASC",
+     ("c",), "idx_interactions_conversation_time", True),
+    ("recent chat history", "SELECT * FROM interactions WHERE conversation_id = ? ORDER BY timestamp DESC LIMIT ?",
+     ("c", 50), "idx_interactions_conversation_time", True),
+    ("unsummarised turns", "SELECT id, user_prompt, llm_response FROM interactions WHERE conversation_id = ? AND id > ? ORDER BY id DESC LIMIT ?",
+     ("c", 0, 50), "idx_interactions_conversation", True),
+    ("conversation list", "SELECT * FROM conversations WHERE user_id = ? ORDER BY is_pinned DESC, created_at DESC",
+     ("u",), "idx_conversations_user_pinned_created", True),
+    ("dashboard interaction count", "SELECT COUNT(*) FROM interactions i JOIN conversations c ON i.conversation_id = c.id WHERE c.user_id = ?",
+     ("u",), "idx_interactions_conversation", False),
+    ("rated interactions", "SELECT i.id FROM interactions i JOIN conversations c ON i.conversation_id = c.id WHERE c.user_id = ? AND i.rating != 0 ORDER BY i.timestamp DESC",
+     ("u",), "idx_conversations_user_pinned_created", False),
+    ("positive examples", "SELECT user_prompt, llm_response FROM interactions WHERE user_prompt LIKE ? AND rating >= 1 ORDER BY rating DESC, timestamp DESC LIMIT 1",
+     ("%q%",), "idx_interactions_rating", True),
+    ("negative examples", "SELECT user_prompt, llm_response FROM interactions WHERE user_prompt LIKE ? AND rating <= -1 ORDER BY rating ASC, timestamp DESC LIMIT 1",
+     ("%q%",), "idx_interactions_rating", False),
+    ("recent queries", "SELECT user_prompt FROM interactions ORDER BY timestamp DESC LIMIT ?",
+     (10,), "idx_interactions_timestamp", True),
+]
+
+def explain(conn, sql, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a query."""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+def verify_query_plans(db_path):
+    """
+    Checks every hot query's plan: no full table scans, the expected index used,
+    and index-ordered results where required.
+
+    Output:
+        list: (name, plan lines, problems) per query - problems is empty if the plan is good.
+    """
+    conn = get_connection(db_path)
+    try:
+        results = []
+        for name, sql, params, index, sorted_by_index in HOT_QUERIES:
+            plan = explain(conn, sql, params)
+            problems = []
+            for line in plan:
+                if line.startswith("SCAN ") and "INDEX" not in line:
+                    problems.append(f"full table scan: {line}")
+                if sorted_by_index and "TEMP B-TREE FOR ORDER BY" in line:
+                    problems.append(f"sorts instead of reading in index order: {line}")
+            if not any(index in line for line in plan):
+                problems.append(f"does not use {index}")
+            results.append((name, plan, problems))
+        return results
+    finally:
+        conn.close()
@@ -0,0 +1,66 @@
+import os
+import re
+
+# Model cascade: answer with a small, fast model first and only escalate to the
+# requested (large) model when the draft fails cheap quality checks.
+
+SMALL_MODEL = os.getenv("CASCADE_SMALL_MODEL", "llama-3.1-8b-instant")
+
+# Drafts shorter than this fail, unless the question itself is short (greetings, yes/no)
+MIN_DRAFT_WORDS = 8
+SHORT_QUESTION_WORDS = 6
+
+# Share of the draft's content words that must appear in the retrieved context
+MIN_GROUNDING_OVERLAP = 0.35
+
+REFUSAL_PATTERN = re.compile(
+    r"\b(i (?:can(?:'|no)t|cannot|am unable to|'m unable to|am not able to|'m not able to)"
+    r"|i (?:do not|don't) (?:know|have (?:access|enough|information))"
+    r"|i'?m not sure|as an ai\b|i apologi[sz]e, but)",
+    re.IGNORECASE
+)
+CODE_REQUEST_PATTERN = re.compile(r"\b(code|function|script|snippet|implement|regex|sql query|class)\b", re.IGNORECASE)
+
+_WORD = re.compile(r"[a-z0-9]{4,}")
+
+def _content_words(text):
+    return set(_WORD.findall(text.lower()))
+
+def score_draft(draft: str, question: str, context: str = "", finish_reason: str = None):
+    """
+    Cheap checks on a small-model draft. No model calls.
+
+    Input:
+        draft (str): The small model's answer.
+        question (str): The user's message.
+        context (str): Retrieved context the answer should be grounded in ('' if none).
+        finish_reason (str): The provider's finish reason ('length' means truncated).
+
+    Output:
+        tuple: (passed, reasons) - reasons lists every failed check.
+    """
+    reasons = []
+    words = draft.split()
+
+    if not words:
+        reasons.append("empty")
+    elif len(words) < MIN_DRAFT_WORDS and len(question.split()) > SHORT_QUESTION_WORDS:
+        reasons.append("too_short")
+
+    if finish_reason == "length":
+        reasons.append("truncated")
+
+    if REFUSAL_PATTERN.search(draft):
+        reasons.append("refusal")
+
+    if CODE_REQUEST_PATTERN.search(question) and "```" not in draft:
+        reasons.append("missing_code")
+
+    if context and words:
+        draft_words = _content_words(draft)
+        if draft_words:
+            overlap = len(draft_words & _content_words(context)) / len(draft_words)
+            if overlap < MIN_GROUNDING_OVERLAP:
+                reasons.append("ungrounded")
+
+    return not reasons, reasons
@@ -0,0 +1,141 @@
+from utils.text_utils import count_tokens, count_tokens_batch, truncate_to_tokens, TOKENS_PER_MESSAGE
+
+# Per-section token budgets for a chat prompt
+DEFAULT_BUDGETS = {
+    "system": 1000,
+    "message": 2000,
+    "summary": 500,
+    "context": 3000,
+    "history": 2000,
+}
+
+# Sections are filled in this order; budget a section doesn't use rolls over to the next one
+SECTION_PRIORITY = ["system", "message", "summary", "context", "history"]
+
+class PromptAssembler:
+    """
+    Builds a chat message list within explicit per-section token budgets.
+
+    The system prompt and user message are truncated if they exceed their budget.
+    Retrieved chunks are added in rank order and history turns newest-first, each
+    only while it still fits; whatever doesn't fit is dropped and reported.
+    """
+    def __init__(self, budgets=None, total_budget=None):
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.total_budget = total_budget
+
+    def assemble(self, system, message, context_chunks=None, history=None, context_header="", summary=""):
+        """
+        Input:
+            system (str): System prompt (without retrieved context).
+            message (str): The user's message.
+            summary (str): Running summary of older conversation turns.
+            context_chunks (list): Retrieved passages, best first.
+            history (list): Past (user, assistant) turns, oldest first.
+            context_header (str): Heading placed before the retrieved passages.
+
+        Output:
+            tuple: (messages, report) - messages as role/content dicts, and a report
+            with the budgets, tokens used per section and what was dropped.
+        """
+        context_chunks = context_chunks or []
+        history = history or []
+
+        remaining_total = self.total_budget if self.total_budget is not None else sum(self.budgets.values())
+        carry = 0
+        used = {}
+        dropped = {"system_truncated": False, "message_truncated": False, "summary_truncated": False, "context_chunks": 0, "history_turns": 0}
+
+        def section_budget(name):
+            return min(self.budgets[name] + carry, remaining_total)
+
+        # System prompt
+        budget = section_budget("system")
+        system_tokens = count_tokens(system) + TOKENS_PER_MESSAGE
+        if system_tokens > budget:
+            system = truncate_to_tokens(system, max(budget - TOKENS_PER_MESSAGE, 0))
+            system_tokens = budget
+            dropped["system_truncated"] = True
+        used["system"] = system_tokens
+        carry = budget - system_tokens
+        remaining_total -= system_tokens
+
+        # User message
+        budget = section_budget("message")
+        message_tokens = count_tokens(message) + TOKENS_PER_MESSAGE
+        if message_tokens > budget:
+            message = truncate_to_tokens(message, max(budget - TOKENS_PER_MESSAGE, 0))
+            message_tokens = budget
+            dropped["message_truncated"] = True
+        used["message"] = message_tokens
+        carry = budget - message_tokens
+        remaining_total -= message_tokens
+
+        # Running summary of older turns
+        budget = section_budget("summary")
+        summary_tokens = 0
+        if summary:
+            summary = f"Summary of the earlier conversation:\n{summary}"
+            summary_tokens = count_tokens(summary)
+            if summary_tokens > budget:
+                summary = truncate_to_tokens(summary, budget)
+                summary_tokens = budget
+                dropped["summary_truncated"] = True
+        used["summary"] = summary_tokens
+        carry = budget - summary_tokens
+        remaining_total -= summary_tokens
+
+        # Retrieved context, best chunk first
+        budget = section_budget("context")
+        kept_chunks = []
+        context_tokens = 0
+        if context_chunks:
+            header_tokens = count_tokens(context_header)
+            chunk_tokens = count_tokens_batch(context_chunks)
+            for chunk, tokens in zip(context_chunks, chunk_tokens):
+                cost = tokens + (header_tokens if not kept_chunks else 0)
+                if context_tokens + cost > budget:
+                    break
+                kept_chunks.append(chunk)
+                context_tokens += cost
+            dropped["context_chunks"] = len(context_chunks) - len(kept_chunks)
+        used["context"] = context_tokens
+        carry = budget - context_tokens
+        remaining_total -= context_tokens
+
+        # History, newest turn first
+        budget = section_budget("history")
+        kept_turns = []
+        history_tokens = 0
+        if history:
+            flat = [text for turn in history for text in turn]
+            flat_tokens = count_tokens_batch(flat)
+            turn_tokens = [flat_tokens[i] + flat_tokens[i + 1] + 2 * TOKENS_PER_MESSAGE for i in range(0, len(flat), 2)]
+            for turn, tokens in zip(reversed(history), reversed(turn_tokens)):
+                if history_tokens + tokens > budget:
+                    break
+                kept_turns.append(turn)
+                history_tokens += tokens
+            kept_turns.reverse()
+            dropped["history_turns"] = len(history) - len(kept_turns)
+        used["history"] = history_tokens
+
+        full_system = system
+        if summary:
+            full_system = f"{full_system}\n\n{summary}"
+        if kept_chunks:
+            full_system = f"{full_system}\n\n{context_header}" + "\n\n".join(kept_chunks)
+
+        messages = [{"role": "system", "content": full_system}]
+        for user_text, assistant_text in kept_turns:
+            messages.append({"role": "user", "content": user_text})
+            messages.append({"role": "assistant", "content": assistant_text})
+        messages.append({"role": "user", "content": message})
+
+        report = {
+            "budgets": dict(self.budgets),
+            "used": used,
+            "total_tokens": sum(used.values()),
+            "dropped": dropped,
+        }
+        return messages, report
@@ -1,12 +1,105 @@
 import os
+import threading
 
 PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts")
 
+# How often the prompts directory is checked for edits (seconds); 0 disables hot reload
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "2"))
+
+class PromptRegistry:
+    """
+    Holds every prompt file in memory, plus objects compiled from them (templates,
+    parsers, chains). Both are built once and swapped out together when a file
+    in the prompts directory changes, so readers never see a half-reloaded set.
+    """
+    def __init__(self, prompts_dir=PROMPTS_DIR, reload_interval=PROMPT_RELOAD_INTERVAL):
+        self.prompts_dir = prompts_dir
+        self.reload_interval = reload_interval
+        self.version = 0
+        self._prompts = {}
+        self._compiled = {}
+        self._mtimes = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.reload()
+
+    def _scan(self):
+        try:
+            names = [n for n in os.listdir(self.prompts_dir) if n.endswith(".txt")]
+        except FileNotFoundError:
+            return {}
+        mtimes = {}
+        for name in names:
+            try:
+                mtimes[name] = os.path.getmtime(os.path.join(self.prompts_dir, name))
+            except OSError:
+                continue
+        return mtimes
+
+    def reload(self):
+        """Reads every prompt file and atomically replaces the loaded set."""
+        mtimes = self._scan()
+        prompts = {}
+        for name in mtimes:
+            try:
+                with open(os.path.join(self.prompts_dir, name), "r", encoding="utf-8") as f:
+                    prompts[name] = f.read().strip()
+            except OSError as e:
+                print(f"Failed to load prompt '{name}': {e}")
+        with self._lock:
+            self._prompts = prompts
+            self._compiled = {}
+            self._mtimes = mtimes
+            self.version += 1
+
+    def get(self, filename: str) -> str:
+        """Returns a prompt's text from memory."""
+        self._ensure_watching()
+        text = self._prompts.get(filename)
+        if text is None:
+            return f"Error: Prompt file '{filename}' not found."
+        return text
+
+    def get_compiled(self, key, builder):
+        """
+        Returns the object built by builder() for key, building it at most once per
+        prompt version. Use it for anything derived from prompt text.
+
+        Input:
+            key: Hashable identity of the compiled object.
+            builder: Zero-argument callable that builds it.
+        """
+        self._ensure_watching()
+        compiled = self._compiled
+        value = compiled.get(key)
+        if value is None:
+            value = builder()
+            with self._lock:
+                # Don't store into a set that a reload has already replaced
+                if compiled is self._compiled:
+                    compiled[key] = value
+        return value
+
+    def _ensure_watching(self):
+        if self._watcher is not None or self.reload_interval <= 0:
+            return
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="prompt-watcher", daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            if self._scan() != self._mtimes:
+                self.reload()
+                print(f"Prompts reloaded (version {self.version}).")
+
+    def stop_watching(self):
+        self._stop.set()
+
+prompt_registry = PromptRegistry()
+
 def load_prompt(filename: str) -> str:
-    """Loads a prompt from the prompts directory."""
-    path = os.path.join(PROMPTS_DIR, filename)
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return f"Error: Prompt file '{filename}' not found."
+    """Loads a prompt from the prompts directory (served from memory, reloaded when files change)."""
+    return prompt_registry.get(filename)
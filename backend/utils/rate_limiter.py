@@ -0,0 +1,232 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from utils.deadline import remaining
+
+# Client-side rate governor shared by every upstream call (Groq, Tavily).
+# Each provider gets a request bucket and, where the provider meters tokens, a
+# token bucket. Callers reserve capacity before sending and sleep in arrival order
+# until it is theirs. 429s and x-ratelimit-* headers pause the provider for
+# everyone, so throughput settles just under the limit instead of bursting into it.
+
+# Fraction of the published limit we aim for
+RATE_LIMIT_HEADROOM = float(os.getenv("RATE_LIMIT_HEADROOM", "0.9"))
+
+# Per-minute limits (0 = unmetered)
+PROVIDER_LIMITS = {
+    "groq": {
+        "requests_per_minute": int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+        "tokens_per_minute": int(os.getenv("GROQ_TOKENS_PER_MINUTE", "12000")),
+    },
+    "tavily": {
+        "requests_per_minute": int(os.getenv("TAVILY_REQUESTS_PER_MINUTE", "100")),
+        "tokens_per_minute": 0,
+    },
+}
+
+# How long a caller may wait in the queue before giving up (seconds)
+DEFAULT_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "30"))
+
+# Completion tokens assumed when reserving token capacity; corrected from the response's usage
+ESTIMATED_COMPLETION_TOKENS = 500
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+
+# Status codes worth retrying; anything else in 4xx is the caller's fault
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class RateLimitTimeout(Exception):
+    """Raised when a call would have to wait past its deadline for capacity."""
+    def __init__(self, provider, wait):
+        super().__init__(f"{provider} rate limit: no capacity within the deadline (next slot in {wait:.1f}s)")
+        self.provider = provider
+        self.wait = wait
+
+class TokenBucket:
+    """
+    Token bucket that lets the balance go negative: a reservation is always granted
+    and the returned delay says when it may be used, which keeps waiters in FIFO order.
+    """
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount, now):
+        """Seconds until amount would be available (without reserving it)."""
+        self._refill(now)
+        deficit = amount - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= amount
+
+    def give_back(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+    def clamp(self, remaining, now):
+        """Aligns with the provider's own count when it reports less headroom than we think."""
+        self._refill(now)
+        self.level = min(self.level, float(remaining))
+
+def parse_duration(value):
+    """
+    Parses a rate-limit reset value: plain seconds ('7', '0.5') or Groq's
+    Go-style durations ('2m59.56s', '120ms'). Returns seconds, or None.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+class RateGovernor:
+    """Request and token buckets for one provider, plus a server-imposed pause."""
+    def __init__(self, provider, requests_per_minute=0, tokens_per_minute=0, headroom=RATE_LIMIT_HEADROOM):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute * headroom) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute * headroom) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens, deadline):
+        """Reserves capacity and returns how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.requests:
+                wait = max(wait, self.requests.delay_for(1, now))
+            if self.tokens and tokens:
+                # A request larger than the whole bucket can only wait for a full one
+                wait = max(wait, self.tokens.delay_for(min(tokens, self.tokens.capacity), now))
+            if deadline is not None and now + wait > deadline:
+                raise RateLimitTimeout(self.provider, wait)
+            if self.requests:
+                self.requests.take(1, now)
+            if self.tokens and tokens:
+                self.tokens.take(tokens, now)
+            return wait
+
+    @staticmethod
+    def _queue_deadline(timeout):
+        left = remaining()
+        if left is not None:
+            timeout = left if timeout is None else min(timeout, left)
+        return time.monotonic() + timeout if timeout is not None else None
+
+    def acquire(self, tokens=0, timeout=DEFAULT_QUEUE_TIMEOUT):
+        """
+        Blocks until the provider has capacity for one request of about `tokens` tokens.
+
+        Input:
+            tokens (int): Estimated tokens (prompt + completion) for token-metered providers.
+            timeout (float): Longest acceptable wait in seconds (None waits indefinitely).
+                Never longer than what is left of the request deadline.
+
+        Raises:
+            RateLimitTimeout: If capacity won't be available in time.
+        """
+        deadline = self._queue_deadline(timeout)
+        wait = self._reserve(tokens, deadline)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens=0, timeout=DEFAULT_QUEUE_TIMEOUT):
+        """Async version of acquire(); waits without blocking the event loop."""
+        deadline = self._queue_deadline(timeout)
+        wait = self._reserve(tokens, deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated, actual):
+        """Corrects a token reservation once the response reports real usage."""
+        if not self.tokens or actual is None:
+            return
+        with self._lock:
+            if actual < estimated:
+                self.tokens.give_back(estimated - actual)
+            else:
+                self.tokens.take(actual - estimated, time.monotonic())
+
+    def pause(self, seconds):
+        """Stops new requests from being sent for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            # Empty the request bucket too, so queued callers resume one by one rather than all at once
+            if self.requests:
+                self.requests.clamp(0, now)
+
+    def update_from_headers(self, status_code, headers):
+        """
+        Feeds a provider response into the governor: Retry-After pauses everyone,
+        and x-ratelimit-remaining-* pull our buckets down to what the server reports.
+        """
+        retry_after = parse_duration(headers.get("retry-after"))
+        if status_code == 429:
+            reset = retry_after
+            if reset is None:
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests")) or BACKOFF_BASE_SECONDS
+            self.pause(reset)
+            print(f"{self.provider} rate limited (429); pausing {reset:.1f}s")
+            return
+
+        now = time.monotonic()
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            if remaining <= 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self.pause(reset)
+            elif bucket is not None:
+                with self._lock:
+                    bucket.clamp(remaining, now)
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+def get_governor(provider: str) -> RateGovernor:
+    """Returns the shared governor for a provider ('groq' or 'tavily')."""
+    with _governors_lock:
+        governor = _governors.get(provider)
+        if governor is None:
+            governor = RateGovernor(provider, **PROVIDER_LIMITS.get(provider, {}))
+            _governors[provider] = governor
+        return governor
+
+def retry_after_seconds(response):
+    """Retry-After from an httpx response (or None)."""
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    return parse_duration(headers.get("retry-after"))
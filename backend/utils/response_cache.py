@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from utils.sqlite_pool import get_connection
+
+# Persistent tier lives next to the other databases
+CACHE_DB = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache.db"))
+
+DEFAULT_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+MEMORY_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "1000"))
+DISK_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_DISK_ENTRIES", "20000"))
+
+# Web search results go stale faster than answers to a fixed prompt
+WEB_SEARCH_TTL_SECONDS = int(os.getenv("WEB_SEARCH_CACHE_TTL", "1800"))
+WEB_SEARCH_DISK_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_DISK_ENTRIES", "5000"))
+
+# Opt-in: key web searches on their set of words (minus SEARCH_STOPWORDS) instead of
+# the normalised query, so reworded searches share results. Word order and filler can
+# change what a search means, so distinct queries may then get each other's results.
+WEB_SEARCH_LOOSE_MATCH = os.getenv("WEB_SEARCH_CACHE_LOOSE", "0") == "1"
+
+# Filler words ignored by the loose web search match
+SEARCH_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "of", "for", "to", "in", "on", "at",
+    "and", "or", "me", "please", "about", "what", "whats", "tell", "show", "find", "search"
+}
+
+# Disk eviction is a full-table statement, so only run it every N writes
+DISK_EVICT_EVERY = 100
+
+def fingerprint(messages, model: str, **params) -> str:
+    """
+    Hashes the request sent upstream: the final message list, the model and
+    sampling parameters. Whitespace in message content is normalised so trivially
+    different submissions of the same prompt match.
+    Accepts role/content dicts or LangChain message objects.
+    """
+    normalized = []
+    for m in messages:
+        if isinstance(m, dict):
+            normalized.append([m["role"], " ".join(m["content"].split())])
+        else:
+            normalized.append([m.type, " ".join(m.content.split())])
+    payload = json.dumps({"messages": normalized, "model": model, "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def search_cache_key(query: str, search_depth: str, sites=None, loose=WEB_SEARCH_LOOSE_MATCH) -> str:
+    """
+    Key for a web search. Case and whitespace in the query are normalised, as in
+    fingerprint(). With loose=True the query is instead reduced to its sorted set of
+    words minus filler, so near-duplicates ("latest python release?" vs "what is the
+    latest release of Python") share an entry - at the cost of also merging queries
+    that differ only in word order ("flights from paris to rome" / "...rome to paris").
+    Result count is not part of the key: a cached search with at least as many results
+    serves smaller requests.
+    """
+    if loose:
+        key_query = sorted(set(re.findall(r"\w+", query.lower())) - SEARCH_STOPWORDS)
+    else:
+        key_query = " ".join(query.lower().split())
+    domains = sorted(d.strip().lower() for d in (sites or []) if d and d.strip())
+    payload = json.dumps({"query": key_query, "loose": loose, "depth": search_depth, "domains": domains}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class TTLCache:
+    """
+    Two-tier key/value cache with expiry.
+
+    Memory tier: LRU dict capped at memory_max entries.
+    Disk tier: SQLite table (shared across namespaces) capped at disk_max entries
+    per namespace, evicting least recently used. Values must be JSON-serialisable.
+    """
+    def __init__(self, namespace: str, ttl=DEFAULT_TTL_SECONDS, memory_max=MEMORY_MAX_ENTRIES, disk_max=DISK_MAX_ENTRIES, db_path=CACHE_DB):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.memory_max = memory_max
+        self.disk_max = disk_max
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db_ready = False # The disk tier is created on first use, not at import
+
+    def _connect(self):
+        if not self._db_ready:
+            with self._lock:
+                if not self._db_ready:
+                    self._init_db()
+                    self._db_ready = True
+        return get_connection(self.db_path)
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = get_connection(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def get(self, key, allow_expired=False):
+        """
+        Returns the cached value, or None on a miss or expired entry.
+        With allow_expired, entries past their TTL that haven't been evicted yet are
+        returned too (used as a fallback while an upstream provider is down).
+        """
+        now = time.time()
+        cutoff = 0 if allow_expired else now
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > cutoff:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row and row[1] > cutoff:
+                conn.execute(
+                    "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key)
+                )
+                conn.commit()
+            conn.close()
+        except sqlite3.Error:
+            return None
+
+        if not row or row[1] <= cutoff:
+            return None
+        value = json.loads(row[0])
+        self._remember(key, value, row[1])
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Stores a value in both tiers."""
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        self._remember(key, value, expires_at)
+
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at, time.time())
+            )
+            with self._lock:
+                self._writes += 1
+                evict = self._writes % DISK_EVICT_EVERY == 0
+            if evict:
+                self._evict_disk(conn)
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            # The cache is an optimisation; never fail the request over it
+            print(f"Cache write failed ({self.namespace}): {e}")
+
+    def clear(self):
+        """Drops every entry in this namespace."""
+        with self._lock:
+            self._memory.clear()
+        conn = self._connect()
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        conn.commit()
+        conn.close()
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self, conn):
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time()))
+        conn.execute("""
+            DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                SELECT key FROM cache_entries WHERE namespace = ?
+                ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.namespace, self.namespace, self.disk_max))
+
+# Completed LLM answers, keyed by fingerprint()
+response_cache = TTLCache("llm_response")
+
+# Tavily results, keyed by search_cache_key(); value is {"count": requested results, "results": [...]}
+web_search_cache = TTLCache("web_search", ttl=WEB_SEARCH_TTL_SECONDS, disk_max=WEB_SEARCH_DISK_ENTRIES)
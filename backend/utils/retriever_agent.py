@@ -1,10 +1,18 @@
 import json
-from langchain_groq import ChatGroq
+import re
+import time
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 from utils.constants import RetrievalStrategy
-from utils.prompt_loader import load_prompt
+from utils.prompt_loader import load_prompt, prompt_registry
+from utils.upstream_clients import get_groq_chat
+from utils.local_router import route_locally, router_classifier, URL_PATTERN
+from utils.router_cache import router_cache
+from utils.rate_limiter import get_governor, backoff_delay, retry_after_seconds, RateLimitTimeout, ESTIMATED_COMPLETION_TOKENS
+from utils.text_utils import count_tokens
+from utils.circuit_breaker import get_breaker, CircuitOpenError
+from utils.deadline import has_time_for, can_wait, DeadlineExceeded
 
 class RetrieverDecision(BaseModel):
     strategy: str = Field(description="The chosen retrieval strategy.")
@@ -14,18 +22,61 @@ class RetrieverDecision(BaseModel):
     confidence_score: int = Field(description="A score from 1-10 indicating confidence in the chosen context source.")
     clarification_needed: bool = Field(description="True if the user's intent is ambiguous (e.g., 'update code' when multiple codes exist in different contexts).")
 
-def get_retriever_decision(user_query, api_key, model_name="llama-3.3-70b-versatile", system_prompt=None):
+VALID_STRATEGIES = {s.value for s in RetrievalStrategy}
+
+def _build_router_prompt():
+    """
+    Builds the router prompt with every static input (strategy list, knowledge base,
+    format instructions) already bound, leaving only {query}.
+    Built once per prompt registry version.
     """
-    Analyzes the user query and decides the best retrieval strategy using an LLM.
+    parser = JsonOutputParser(pydantic_object=RetrieverDecision)
+
+    # Dynamic Prompt using Enum values
+    strategies_template = load_prompt("retriever_strategies.txt")
+    # Placeholders are the lower-cased enum member names ({direct_llm}, {graph_ql}, ...)
+    strategies_text = strategies_template.format(**{s.name.lower(): s.value for s in RetrievalStrategy})
+
+    router_system_template = load_prompt("retriever_router_system.txt")
+    retriever_knowledge_base = load_prompt("retriever_knowledge_base.txt")
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", router_system_template),
+        ("user", "Query: {query}\n\n{format_instructions}")
+    ])
+    prompt = prompt.partial(
+        strategies_text=strategies_text,
+        knowledge_base=retriever_knowledge_base,
+        web_search=RetrievalStrategy.WEB_SEARCH.value,
+        format_instructions=parser.get_format_instructions()
+    )
+    prompt_tokens = sum(count_tokens(m.content) for m in prompt.format_messages(query=""))
+    return prompt, parser, prompt_tokens
+
+def get_router_chain(api_key, model_name):
+    """Returns the compiled prompt | llm | parser chain for this key and model."""
+    def build():
+        prompt, parser, _ = prompt_registry.get_compiled("retriever_router_prompt", _build_router_prompt)
+        return prompt | get_groq_chat(api_key, model_name, 0) | parser
+    return prompt_registry.get_compiled(("retriever_router_chain", api_key, model_name), build)
+
+def get_retriever_decision(user_query, api_key, model_name="llama-3.3-70b-versatile", system_prompt=None, vector_store_manager=None):
+    """
+    Analyzes the user query and decides the best retrieval strategy.
+    Previously made decisions are looked up first (utils/router_cache.py), then
+    cheap local signals are tried (utils/local_router.py); the LLM router only runs
+    when neither answers.
     
     Args:
         user_query (str): The user's message.
         api_key (str): Groq API Key.
         model_name (str): LLM Model to use.
         system_prompt (str): Optional custom behavior.
+        vector_store_manager (VectorStoreManager): Session vector store, enables the local tier.
 
     Returns:
-        dict: Decision with keys 'strategy', 'confidence_score', 'reasoning', 'refined_query', 'context_source'.
+        dict: Decision with keys 'strategy', 'confidence_score', 'reasoning', 'refined_query', 'context_source'
+        and 'router' ('cache', 'local' or 'llm').
     """
     if system_prompt:
         base_instruction = f"SYSTEM BEHAVIOR: {system_prompt}\n\n"
@@ -39,77 +90,97 @@ def get_retriever_decision(user_query, api_key, model_name="llama-3.3-70b-versat
         "refined_query": user_query,
         "context_source": "general_knowledge",
         "confidence_score": 5,
-        "clarification_needed": False
+        "clarification_needed": False,
+        "router": "llm"
     }
 
-    # 0. Regex Check for URLs
-    import re
-    # Pattern to find URLs
-    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-    urls = re.findall(url_pattern, user_query)
-    
-    if urls:
-        return {
-            "strategy": RetrievalStrategy.WEB_SEARCH.value,
-            "reasoning": f"User query contains specific URLs: {urls}. Switching to Web Search.",
-            "refined_query": user_query,
-            "urls": urls # Pass extracted URLs
-        }
+    # 0. Decision cache: exact match on the normalised query, then nearest past query.
+    # Entries are scoped to the document set they were made against.
+    if vector_store_manager is not None:
+        store_id, doc_version = vector_store_manager.store_id, vector_store_manager.doc_version
+    else:
+        store_id, doc_version = None, 0
+    cache_variant = (model_name, system_prompt or "")
+    cached_decision = router_cache.get(user_query, store_id, doc_version, variant=cache_variant)
+    if cached_decision:
+        return cached_decision
+
+    query_vector = None
+    if vector_store_manager is not None and not re.search(URL_PATTERN, user_query):
+        try:
+            query_vector = vector_store_manager.get_embeddings().embed_query(user_query)
+        except Exception as e:
+            print(f"Query embedding failed, skipping similarity lookup: {e}")
+        if query_vector is not None:
+            cached_decision = router_cache.get(user_query, store_id, doc_version, query_vector=query_vector, variant=cache_variant)
+            if cached_decision:
+                return cached_decision
+
+    # 1. Local fast path (URL regex, document match scores, classifier)
+    try:
+        local_decision = route_locally(user_query, vector_store_manager, query_vector=query_vector)
+    except Exception as e:
+        print(f"Local router failed, falling back to LLM: {e}")
+        local_decision = None
+    if local_decision:
+        return local_decision
 
     if not api_key:
         fallback_decision["reasoning"] = "No API key provided."
         return fallback_decision
 
+    if not has_time_for("routing"):
+        fallback_decision["strategy"] = RetrievalStrategy.DIRECT_LLM.value
+        fallback_decision["reasoning"] = "Skipped the LLM router: not enough time left in the request."
+        return fallback_decision
+
     try:
-        llm = ChatGroq(temperature=0, groq_api_key=api_key, model_name=model_name)
+        chain = get_router_chain(api_key, model_name)
+        _, _, prompt_tokens = prompt_registry.get_compiled("retriever_router_prompt", _build_router_prompt)
+        governor = get_governor("groq")
+        breaker = get_breaker("groq")
+        estimated_tokens = prompt_tokens + count_tokens(user_query) + ESTIMATED_COMPLETION_TOKENS
         
-        parser = JsonOutputParser(pydantic_object=RetrieverDecision)
+        def invoke():
+            governor.acquire(tokens=estimated_tokens)
+            return chain.invoke({"query": user_query})
         
-        # Dynamic Prompt using Enum values
-        strategies_template = load_prompt("retriever_strategies.txt")
-        strategies_text = strategies_template.format(
-            direct_llm=RetrievalStrategy.DIRECT_LLM.value,
-            vector_based=RetrievalStrategy.VECTOR.value,
-            hybrid=RetrievalStrategy.HYBRID.value,
-            web_search=RetrievalStrategy.WEB_SEARCH.value
-        )
-        
-        router_system_template = load_prompt("retriever_router_system.txt")
-        retriever_knowledge_base = load_prompt("retriever_knowledge_base.txt")
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", router_system_template),
-            ("user", "Query: {query}\n\n{format_instructions}")
-        ])
-        
-        chain = prompt | llm | parser
-        
-        # Retry logic
+        # Retry logic, backing off between attempts (longer if Groq sent Retry-After)
         max_retries = 3
         last_error = None
+        retry_after = None
         
         for attempt in range(max_retries):
+            if attempt:
+                delay = backoff_delay(attempt - 1, retry_after)
+                if not can_wait(delay, "routing"):
+                    last_error = DeadlineExceeded("routing")
+                    break
+                time.sleep(delay)
+                retry_after = None
             try:
-                decision = chain.invoke({
-                    "strategies_text": strategies_text,
-                    "knowledge_base": retriever_knowledge_base,
-                    "vector_strategy": RetrievalStrategy.VECTOR_BASED.value,
-                    "direct_strategy": RetrievalStrategy.DIRECT_LLM.value,
-                    "web_strategy": RetrievalStrategy.WEB_SEARCH.value,
-                    "query": user_query,
-                    "format_instructions": parser.get_format_instructions()
-                })
+                decision = breaker.call(invoke)
                 # Validate strategy is known
-                if decision.get("strategy") not in [s.value for s in RetrievalStrategy]:
+                if decision.get("strategy") not in VALID_STRATEGIES:
                      decision["strategy"] = RetrievalStrategy.VECTOR_BASED.value # Default to safe option if hallucinated
+                decision["router"] = "llm"
+                
+                # Every LLM decision becomes a training example for the local classifier
+                if vector_store_manager is not None:
+                    router_classifier.add_example(user_query, decision["strategy"], query_vector=query_vector)
+                router_cache.set(user_query, decision, store_id, doc_version, query_vector=query_vector, variant=cache_variant)
                 return decision
+            except (RateLimitTimeout, CircuitOpenError) as e:
+                last_error = e
+                break
             except Exception as e:
                 last_error = e
+                retry_after = retry_after_seconds(getattr(e, "response", None))
                 continue
         
         # Fallback if retries fail
         fallback_decision["strategy"] = RetrievalStrategy.DIRECT_LLM.value
-        fallback_decision["reasoning"] = f"Agent decision failed after {max_retries} attempts: {str(last_error)}"
+        fallback_decision["reasoning"] = f"Agent decision failed: {str(last_error)}"
         return fallback_decision
 
     except Exception as e:
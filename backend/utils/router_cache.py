@@ -0,0 +1,84 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Routing decisions are cached per document set: an entry is only valid for the
+# store (store_id) and document version (doc_version) it was made against, so
+# uploading or reloading documents invalidates every earlier decision.
+ROUTER_CACHE_TTL_SECONDS = int(os.getenv("ROUTER_CACHE_TTL", "21600"))
+ROUTER_CACHE_MAX_ENTRIES = 1000
+
+# Squared L2 distance between normalised embeddings below which two queries count as the same question
+SIMILAR_QUERY_DISTANCE = 0.1
+
+def normalize_query(query: str) -> str:
+    """Lowercases, collapses whitespace and strips trailing punctuation."""
+    return re.sub(r"[\s?.!]+$", "", " ".join(query.lower().split()))
+
+class RouterDecisionCache:
+    """
+    In-memory LRU cache of routing decisions with exact (normalised text) and
+    embedding-similarity lookup, TTL expiry and invalidation by document version.
+    """
+    def __init__(self, ttl=ROUTER_CACHE_TTL_SECONDS, max_entries=ROUTER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # (store_id, variant, normalised query) -> (expires_at, doc_version, decision, vector)
+        self._lock = threading.Lock()
+
+    def get(self, query, store_id, doc_version, query_vector=None, variant=None):
+        """
+        Input:
+            query (str): The user's message.
+            store_id (str): Identity of the user's vector store.
+            doc_version (int): Current document version of that store.
+            query_vector (list): Optional embedding of the query, enables near-duplicate lookup.
+            variant: Anything else the decision depends on (model, system prompt).
+
+        Output:
+            dict or None: A copy of the cached decision (router='cache'), or None.
+        """
+        now = time.time()
+        key = (store_id, variant, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, version, decision, _ = entry
+                if expires_at > now and version == doc_version:
+                    self._entries.move_to_end(key)
+                    return {**decision, "router": "cache"}
+                del self._entries[key]
+
+            if query_vector is None:
+                return None
+
+            # Near-duplicate lookup among this store's live entries
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if k[:2] == (store_id, variant) and e[3] is not None and e[0] > now and e[1] == doc_version
+            ]
+        if not candidates:
+            return None
+
+        vectors = np.array([e[3] for _, e in candidates], dtype="float32")
+        distances = ((vectors - np.array(query_vector, dtype="float32")) ** 2).sum(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > SIMILAR_QUERY_DISTANCE:
+            return None
+        decision = candidates[best][1][2]
+        # The cached refinement was written for a slightly different wording
+        return {**decision, "refined_query": query, "router": "cache"}
+
+    def set(self, query, decision, store_id, doc_version, query_vector=None, variant=None):
+        """Stores a routing decision for this store and document version."""
+        key = (store_id, variant, normalize_query(query))
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, doc_version, dict(decision), query_vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+router_cache = RouterDecisionCache()
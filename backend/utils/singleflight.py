@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls that share a key: the first caller runs the
+    work, everyone who arrives while it is in flight awaits the same result.
+    Nothing is cached once the call completes (that's the response cache's job).
+    """
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, func):
+        """
+        Input:
+            key: Hashable identity of the work (e.g. a prompt fingerprint).
+            func: Zero-argument coroutine function that does the work.
+
+        Output:
+            tuple: (result, shared) - shared is True if this caller joined another's call.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            # shield: one waiter disconnecting must not cancel the call for the others
+            return await asyncio.shield(future), True
+
+        future = asyncio.ensure_future(func())
+        self._inflight[key] = future
+
+        def _forget(done):
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            if not done.cancelled():
+                done.exception() # Mark as retrieved so a failure with no waiters isn't logged as unhandled
+
+        future.add_done_callback(_forget)
+        return await asyncio.shield(future), False
+
+class ThreadSingleFlight:
+    """Thread-based SingleFlight for synchronous callers (the Streamlit app)."""
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Input:
+            key: Hashable identity of the work.
+            func: Zero-argument callable that does the work.
+
+        Output:
+            tuple: (result, shared)
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result(), False
@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import threading
+
+# Shared SQLite access. Connections are pooled per database file and set up once
+# with WAL journaling (readers no longer block on a writer), synchronous=NORMAL
+# (safe with WAL, no fsync per commit), a busy timeout instead of immediate
+# "database is locked" errors, and larger page cache / mmap.
+#
+# get_connection() is a drop-in for sqlite3.connect(): close() hands the
+# connection back to the pool (rolling back anything uncommitted) instead of
+# closing it.
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Idle connections kept per database; more are opened on demand and closed when returned
+POOL_MAX_IDLE = int(os.getenv("SQLITE_POOL_SIZE", "16"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+class PooledConnection:
+    """
+    A pooled sqlite3 connection. Behaves like sqlite3.Connection (attribute access,
+    row_factory, `with conn:` transactions) except that close() returns it to the pool.
+    """
+    def __init__(self, pool, conn):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+
+    def __getattr__(self, name):
+        conn = self.__dict__["_conn"]
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def close(self):
+        conn = self.__dict__["_conn"]
+        if conn is None:
+            return
+        object.__setattr__(self, "_conn", None)
+        self._pool.release(conn)
+
+    def __del__(self):
+        # Callers that raise before close() (e.g. an HTTPException) still give the connection back
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """Idle-connection pool for one SQLite database file."""
+    def __init__(self, db_path, max_idle=POOL_MAX_IDLE):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # check_same_thread=False: a connection may be returned by one executor thread and reused by another
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connect(self) -> PooledConnection:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_connection(db_path: str) -> PooledConnection:
+    """
+    Checks out a connection to db_path from its shared pool.
+
+    Input:
+        db_path (str): SQLite database file.
+
+    Output:
+        PooledConnection: Use like sqlite3.connect(db_path); close() returns it to the pool.
+    """
+    db_path = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[db_path] = pool
+    return pool.connect()
+
+def close_all_pools():
+    """Closes every idle pooled connection (on shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
@@ -24,6 +24,8 @@ def save_stats():
         "pages_scraped_count": st.session_state.pages_scraped_count,
         "llm_provider_usage": st.session_state.llm_provider_usage,
         "llm_model_usage": st.session_state.llm_model_usage,
+        "router_local_count": st.session_state.router_local_count,
+        "router_llm_count": st.session_state.router_llm_count,
     }
     with open(STATS_FILE, "w") as f:
         json.dump(stats_data, f)
@@ -60,6 +62,8 @@ def init_state():
         st.session_state.setdefault("llm_call_count", stats.get("llm_call_count", 0))
         st.session_state.setdefault("token_count", stats.get("token_count", 0))
         st.session_state.setdefault("pages_scraped_count", stats.get("pages_scraped_count", 0))
+        st.session_state.setdefault("router_local_count", stats.get("router_local_count", 0))
+        st.session_state.setdefault("router_llm_count", stats.get("router_llm_count", 0))
         st.session_state.setdefault("llm_provider_usage", stats.get("llm_provider_usage", {"Groq (Web-based)": 0}))
         st.session_state.setdefault("llm_model_usage", stats.get("llm_model_usage", {}))
         
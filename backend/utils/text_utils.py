@@ -1,11 +1,144 @@
+import os
+from functools import lru_cache
+
+# BPE encoding used for counting. cl100k only approximates Groq's Llama/GPT-OSS tokenizers
+# (they can produce more tokens for the same text), hence TOKEN_SAFETY_MARGIN below;
+# override with TOKENIZER_ENCODING if a closer encoding is available.
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+# tiktoken downloads its BPE file on first use. Keeping it in the repo's tokenizer_cache
+# directory means a deployment that ships that directory never needs network access
+# (populate it by loading the tokenizer once online). TIKTOKEN_CACHE_DIR overrides this.
+TOKENIZER_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tokenizer_cache"))
+os.environ.setdefault("TIKTOKEN_CACHE_DIR", TOKENIZER_CACHE_DIR)
+
+# Counting from length (chars / 4) is far too loose to pack prompts with, so a missing
+# tokenizer is an error unless this is set (e.g. for offline development)
+ALLOW_TOKEN_ESTIMATE = os.getenv("TOKENIZER_ALLOW_ESTIMATE", "0") == "1"
+
+# Share of a model's prompt budget left unused to absorb tokenizer mismatch
+TOKEN_SAFETY_MARGIN = float(os.getenv("TOKEN_SAFETY_MARGIN", "0.1"))
+
+# Context windows (prompt + completion) for the Groq models offered in Settings
+MODEL_CONTEXT_LIMITS = {
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+    "openai/gpt-oss-120b": 131072,
+    "openai/gpt-oss-20b": 131072,
+    "qwen/qwen3-32b": 131072,
+    "groq/compound": 131072,
+    "llama3-8b-8192": 8192,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+
+# Tokens kept free for the model's answer when packing a prompt
+RESPONSE_TOKEN_RESERVE = 2048
+
+# Chat-format overhead per message (role markers, separators)
+TOKENS_PER_MESSAGE = 4
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """
+    Loads the tokenizer once per process.
+
+    Output:
+        Encoding or None: A tiktoken encoding, or None (counts estimated from length) if it
+        can't be loaded and TOKENIZER_ALLOW_ESTIMATE=1.
+
+    Raises:
+        RuntimeError: If tiktoken or its BPE file is unavailable (e.g. offline with an empty cache).
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        if not ALLOW_TOKEN_ESTIMATE:
+            raise RuntimeError(
+                f"Could not load the {TOKENIZER_ENCODING} tokenizer ({e}). Load it once with network access to "
+                f"populate {os.environ['TIKTOKEN_CACHE_DIR']}, or set TOKENIZER_ALLOW_ESTIMATE=1 to estimate token counts."
+            ) from e
+        print(f"WARNING: tokenizer unavailable, estimating tokens from length: {e}")
+        return None
+
+@lru_cache(maxsize=8192)
 def count_tokens(text: str) -> int:
     """
-    Roughly estimates the number of tokens in a text string (char count / 4).
-    
+    Counts the tokens in a text string. Results are cached, since splitters and prompt
+    budgeting re-count the same pieces many times.
+
+    Input:
+        text (str): Input text.
+
+    Output:
+        int: Token count (estimated as char count / 4 if no tokenizer is available).
+    """
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return len(text) // 4
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+def count_tokens_batch(texts: list) -> list:
+    """
+    Counts tokens for many texts at once (tiktoken encodes the batch in parallel threads).
+
+    Input:
+        texts (list): List of strings.
+
+    Output:
+        list: Token count per text.
+    """
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [len(t) // 4 for t in texts]
+    return [len(ids) for ids in tokenizer.encode_batch(texts, disallowed_special=())]
+
+def count_message_tokens(messages: list) -> int:
+    """
+    Counts the tokens a chat message list will use, including per-message overhead.
+
+    Input:
+        messages (list): Message dicts (role, content) or LangChain message objects.
+
+    Output:
+        int: Token count.
+    """
+    contents = [m["content"] if isinstance(m, dict) else m.content for m in messages]
+    return sum(count_tokens_batch(contents)) + TOKENS_PER_MESSAGE * len(messages)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts text down to at most max_tokens tokens.
+
     Input:
         text (str): Input text.
-    
+        max_tokens (int): Token limit.
+
+    Output:
+        str: The text, unchanged if it already fits.
+    """
+    if max_tokens <= 0:
+        return ""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return text[:max_tokens * 4]
+    ids = tokenizer.encode(text, disallowed_special=())
+    if len(ids) <= max_tokens:
+        return text
+    return tokenizer.decode(ids[:max_tokens])
+
+def get_prompt_budget(model: str) -> int:
+    """
+    Returns how many prompt tokens can be sent to a model while leaving room for the answer
+    and a safety margin for the difference between cl100k and the model's own tokenizer.
+
+    Input:
+        model (str): Groq model name.
+
     Output:
-        int: Estimated token count.
+        int: Prompt token budget.
     """
-    return len(text) // 4
+    available = MODEL_CONTEXT_LIMITS.get(model, DEFAULT_CONTEXT_LIMIT) - RESPONSE_TOKEN_RESERVE
+    return int(available * (1 - TOKEN_SAFETY_MARGIN))
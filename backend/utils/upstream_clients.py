@@ -0,0 +1,125 @@
+import atexit
+import os
+import threading
+import httpx
+from utils.rate_limiter import get_governor
+from utils.deadline import UPSTREAM_TIMEOUT_SECONDS, CONNECT_TIMEOUT_SECONDS
+
+# Shared, keep-alive connection pools for upstream providers (Groq, Tavily).
+# One pool per provider so each host gets its own connection limit.
+
+# USE_MOCK_UPSTREAMS=1 points both providers at the local stand-in server
+# (python -m benchmarks.mock_upstreams) so load tests run offline. Explicit
+# GROQ_BASE_URL / TAVILY_BASE_URL still win.
+USE_MOCK_UPSTREAMS = os.getenv("USE_MOCK_UPSTREAMS", "0") == "1"
+MOCK_UPSTREAM_URL = os.getenv("MOCK_UPSTREAM_URL", "http://127.0.0.1:8900")
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", MOCK_UPSTREAM_URL if USE_MOCK_UPSTREAMS else "https://api.groq.com")
+TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL", MOCK_UPSTREAM_URL if USE_MOCK_UPSTREAMS else "https://api.tavily.com")
+
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_PER_HOST = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+# Default for calls made without an explicit (deadline-derived) timeout
+DEFAULT_TIMEOUT = httpx.Timeout(UPSTREAM_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+
+_lock = threading.Lock()
+_sync_clients = {}
+_async_clients = {}
+_groq_chat_models = {}
+
+def _http2_available():
+    """HTTP/2 needs the optional h2 package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _rate_limit_hooks(provider: str, is_async: bool):
+    """Response hooks that feed every upstream response (429s, x-ratelimit-* headers) to the provider's governor."""
+    governor = get_governor(provider)
+    if is_async:
+        async def hook(response):
+            governor.update_from_headers(response.status_code, response.headers)
+    else:
+        def hook(response):
+            governor.update_from_headers(response.status_code, response.headers)
+    return {"response": [hook]}
+
+def _client_kwargs(provider: str, is_async: bool = False):
+    return {
+        "event_hooks": _rate_limit_hooks(provider, is_async),
+        "http2": _http2_available(),
+        "timeout": DEFAULT_TIMEOUT,
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+        ),
+    }
+
+def get_http_client(provider: str) -> httpx.Client:
+    """
+    Returns the shared synchronous client for a provider ('groq' or 'tavily').
+    Thread-safe, so Streamlit sessions and worker threads can share it.
+    """
+    with _lock:
+        client = _sync_clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.Client(**_client_kwargs(provider))
+            _sync_clients[provider] = client
+        return client
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """Returns the shared async client for a provider ('groq' or 'tavily')."""
+    with _lock:
+        client = _async_clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**_client_kwargs(provider, is_async=True))
+            _async_clients[provider] = client
+        return client
+
+def get_groq_chat(api_key: str, model_name: str, temperature: float):
+    """
+    Returns a ChatGroq instance for (api_key, model, temperature), built once and reused.
+    All instances share the pooled Groq connections.
+    """
+    from langchain_groq import ChatGroq
+
+    key = (api_key, model_name, temperature)
+    with _lock:
+        llm = _groq_chat_models.get(key)
+    if llm is None:
+        llm = ChatGroq(
+            temperature=temperature,
+            groq_api_key=api_key,
+            model_name=model_name,
+            groq_api_base=GROQ_BASE_URL,
+            request_timeout=UPSTREAM_TIMEOUT_SECONDS,
+            http_client=get_http_client("groq"),
+            http_async_client=get_async_http_client("groq")
+        )
+        with _lock:
+            llm = _groq_chat_models.setdefault(key, llm)
+    return llm
+
+def close_clients():
+    """Closes every synchronous pool. Safe to call more than once."""
+    with _lock:
+        for client in _sync_clients.values():
+            client.close()
+        _sync_clients.clear()
+        _groq_chat_models.clear()
+
+async def aclose_clients():
+    """Closes every pool, async and sync. Called on application shutdown."""
+    with _lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+    close_clients()
+
+# Streamlit has no shutdown hook, so also close the sync pools at interpreter exit
+atexit.register(close_clients)
@@ -1,4 +1,5 @@
 import os
+import uuid
 import faiss
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
@@ -12,11 +13,17 @@ from langchain_core.documents import Document
 
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 
+# Persisted index written by bulk_index.py and loaded by the API on startup
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "faiss_index"))
+
 class VectorStoreManager:
     def __init__(self):
         self.embeddings = None
         self.vector_store = None # Documents from upload
         self.memory_store = None # Past query-answer pairs
+        # Identify the document set; bumped whenever documents change so cached routing decisions expire
+        self.store_id = uuid.uuid4().hex
+        self.doc_version = 0
 
     def get_embeddings(self):
         if self.embeddings is None:
@@ -38,6 +45,7 @@ class VectorStoreManager:
             return None
         
         self.vector_store = FAISS.from_documents(documents, self.get_embeddings())
+        self.doc_version += 1
         return self.vector_store
 
     def add_documents(self, documents):
@@ -54,6 +62,56 @@ class VectorStoreManager:
             self.create_vector_store(documents)
         else:
             self.vector_store.add_documents(documents)
+            self.doc_version += 1
+
+    def add_embeddings(self, texts, vectors, metadatas=None):
+        """
+        Adds pre-computed embeddings to the vector store. If none exists, creates one.
+        Used by the bulk indexer so embedding can happen in large batches.
+        
+        Input:
+            texts (list): Chunk texts.
+            vectors (list): Embedding vectors, one per text.
+            metadatas (list): Optional metadata dicts, one per text.
+        """
+        if not texts:
+            return
+
+        text_embeddings = list(zip(texts, vectors))
+        if self.vector_store is None:
+            self.vector_store = FAISS.from_embeddings(text_embeddings, self.get_embeddings(), metadatas=metadatas)
+        else:
+            self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
+        self.doc_version += 1
+
+    def save_local(self, path=INDEX_DIR):
+        """
+        Persists the document vector store to disk.
+        
+        Input:
+            path (str): Directory to write the FAISS index to.
+        """
+        if self.vector_store is None:
+            return
+        os.makedirs(path, exist_ok=True)
+        self.vector_store.save_local(path)
+
+    def load_local(self, path=INDEX_DIR):
+        """
+        Loads a persisted document vector store from disk, if one exists.
+        
+        Input:
+            path (str): Directory containing a FAISS index.
+            
+        Output:
+            bool: True if an index was loaded.
+        """
+        if not os.path.exists(os.path.join(path, "index.faiss")):
+            return False
+        # The index is written by our own bulk indexer, so the pickle is trusted
+        self.vector_store = FAISS.load_local(path, self.get_embeddings(), allow_dangerous_deserialization=True)
+        self.doc_version += 1
+        return True
 
     def add_to_memory(self, query, answer):
         """
@@ -115,6 +173,22 @@ class VectorStoreManager:
             return []
         return self.vector_store.similarity_search(query, k=k)
 
+    def similarity_search_batch(self, queries, k=4):
+        """
+        Similarity search for many queries with one embedding call for all of them.
+
+        Input:
+            queries (list): Search queries.
+            k (int): Number of documents to return per query.
+
+        Output:
+            list: One list of matching Document objects per query.
+        """
+        if self.vector_store is None or not queries:
+            return [[] for _ in queries]
+        vectors = self.get_embeddings().embed_documents(queries)
+        return [self.vector_store.similarity_search_by_vector(vector, k=k) for vector in vectors]
+
 # Simple singleton pattern for the app session
 if "vector_store_manager" not in os.environ:
     # Just a placeholder, actual instantiation happens in app state
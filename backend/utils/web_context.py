@@ -0,0 +1,95 @@
+import os
+import faiss
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utils.text_utils import count_tokens, count_tokens_batch, truncate_to_tokens
+
+# Web results are chunked, embedded into a throwaway per-query index and only
+# the passages closest to the query are sent to the model, instead of the full
+# text of every result.
+
+WEB_CHUNK_TOKENS = 200
+WEB_CHUNK_OVERLAP_TOKENS = 30
+
+# Tokens of web passages allowed into the prompt
+WEB_CONTEXT_TOKEN_BUDGET = int(os.getenv("WEB_CONTEXT_TOKEN_BUDGET", "1500"))
+
+def chunk_web_results(web_results):
+    """
+    Splits each result's content into passages.
+
+    Output:
+        list: (result index, passage text) pairs.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=WEB_CHUNK_TOKENS,
+        chunk_overlap=WEB_CHUNK_OVERLAP_TOKENS,
+        length_function=count_tokens,
+    )
+    passages = []
+    for i, result in enumerate(web_results):
+        for chunk in splitter.split_text(result.get("content") or ""):
+            passages.append((i, chunk))
+    return passages
+
+def select_web_passages(query, web_results, embeddings, token_budget=WEB_CONTEXT_TOKEN_BUDGET):
+    """
+    Picks the web passages most relevant to the query that fit in the token budget.
+
+    Input:
+        query (str): The (refined) search query.
+        web_results (list): Tavily result dicts (title, url, content).
+        embeddings: LangChain embeddings model (the vector store's).
+        token_budget (int): Maximum tokens of passages to keep.
+
+    Output:
+        tuple: (context text grouped by source, stats dict with passages/kept/tokens_in/tokens_out)
+    """
+    passages = chunk_web_results(web_results)
+    if not passages:
+        return "", {"passages": 0, "kept": 0, "tokens_in": 0, "tokens_out": 0}
+
+    texts = [text for _, text in passages]
+    token_counts = count_tokens_batch(texts)
+
+    # Ephemeral index: lives only for this query, inner product over normalised vectors = cosine
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+    query_vector = np.asarray([embeddings.embed_query(query)], dtype="float32")
+    faiss.normalize_L2(vectors)
+    faiss.normalize_L2(query_vector)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    _, ranked = index.search(query_vector, len(texts))
+
+    # Greedy fill by relevance; skip passages that would overflow and try smaller ones
+    kept, used = [], 0
+    for i in ranked[0]:
+        if i < 0:
+            continue
+        if used + token_counts[i] <= token_budget:
+            kept.append(i)
+            used += token_counts[i]
+
+    # Present kept passages grouped by result, in their original order
+    sections = []
+    for result_index in sorted({passages[i][0] for i in kept}):
+        result = web_results[result_index]
+        body = "\n".join(passages[i][1] for i in sorted(kept) if passages[i][0] == result_index)
+        sections.append(f"--Source: {result.get('title', 'Web Result')} ({result.get('url', '')})--\n{body}")
+
+    stats = {"passages": len(passages), "kept": len(kept), "tokens_in": sum(token_counts), "tokens_out": used}
+    return "\n\n".join(sections), stats
+
+def build_web_context(query, web_results, embeddings, token_budget=WEB_CONTEXT_TOKEN_BUDGET):
+    """
+    select_web_passages() that never fails the turn: if embedding isn't possible,
+    falls back to the concatenated results cut to the budget.
+    """
+    try:
+        return select_web_passages(query, web_results, embeddings, token_budget)
+    except Exception as e:
+        print(f"Web passage ranking failed ({e}); truncating raw results instead")
+        combined = "\n\n".join(r.get("content") or "" for r in web_results)
+        text = truncate_to_tokens(combined, token_budget)
+        tokens_in = count_tokens(combined)
+        return text, {"passages": len(web_results), "kept": len(web_results), "tokens_in": tokens_in, "tokens_out": min(tokens_in, token_budget)}
@@ -4,21 +4,44 @@ import streamlit.components.v1 as components
 import json
 import os
 from utils.api_clients import run_tavily_search, ask_groq
-from utils.logging_utils import log_search, log_llm_call
-from utils.text_utils import count_tokens
-from utils.database import log_interaction, find_similar_interaction, update_interaction_rating, create_conversation, load_chat_history_from_db
+from utils.logging_utils import log_search, log_llm_call, log_routing
+from utils.text_utils import count_tokens, get_prompt_budget
+from utils.prompt_assembler import PromptAssembler, DEFAULT_BUDGETS
+from utils.database import log_interaction, find_similar_interaction, find_similar_negative_interaction, update_interaction_rating, create_conversation, load_chat_history_from_db
 from utils.prompt_loader import load_prompt
 from utils.document_processor import process_uploaded_file
 from utils.vector_store_manager import VectorStoreManager
 from utils.retriever_agent import get_retriever_decision
+from utils.executors import CPU_EXECUTOR, DB_EXECUTOR, UPSTREAM_EXECUTOR, submit_in_context
+from utils.deadline import start_deadline, has_time_for
+from utils.circuit_breaker import get_breaker
+from utils.web_context import build_web_context
 
 from utils.constants import RetrievalStrategy
 
+# How each routing tier is shown in the "Thinking Process" expander
+ROUTER_LABELS = {"cache": "cached decision", "local": "local fast path", "llm": "LLM router"}
+
 # Initialize Vector Store Manager in Session State
 if "vector_store_manager" not in st.session_state:
     st.session_state.vector_store_manager = VectorStoreManager()
 
 
+def history_turns(chat_messages):
+    """
+    Pairs the displayed chat into (user, assistant) turns for PromptAssembler.
+    A question without an answer (e.g. one that stopped for clarification) is skipped.
+    """
+    turns = []
+    pending_user = None
+    for m in chat_messages:
+        if m["role"] == "user":
+            pending_user = m["content"]
+        elif m["role"] == "assistant" and pending_user is not None:
+            turns.append((pending_user, m["content"]))
+            pending_user = None
+    return turns
+
 def check_pending_query():
     if "pending_query" in st.session_state and st.session_state.pending_query:
         q = st.session_state.pending_query
@@ -179,6 +202,8 @@ def render_page():
         user_prompt = pending_q
 
     if user_prompt:
+        # Time budget for this turn; routing, web search and generation size their timeouts from it
+        start_deadline()
         
         # New Conversation Logic
         if not st.session_state.get("current_conversation_id"):
@@ -199,8 +224,17 @@ def render_page():
             st.markdown(user_prompt)
 
         with st.chat_message("assistant"):
+            vector_store_manager = st.session_state.vector_store_manager
+
+            # Semantic memory is checked first: it's a local embedding lookup, and a hit
+            # answers the turn, so the routing LLM call (which can't be cancelled once
+            # running) is only made on a miss. The past-interaction lookups overlap it.
+            memory_future = CPU_EXECUTOR.submit(vector_store_manager.check_memory, user_prompt)
+            positive_future = DB_EXECUTOR.submit(find_similar_interaction, user_prompt)
+            negative_future = DB_EXECUTOR.submit(find_similar_negative_interaction, user_prompt)
+
             # Check Semantic Memory
-            cached_response = st.session_state.vector_store_manager.check_memory(user_prompt)
+            cached_response = memory_future.result()
             if cached_response:
                 st.success("⚡ Accessed from Memory")
                 st.markdown(cached_response)
@@ -225,13 +259,24 @@ def render_page():
                 # For now, we rerun to update UI
                 st.session_state.completed_interaction = True # Flag to avoid re-run loops if needed, but rerun is simple
             else:
-            # Intelligent Agent Decision
+                # Memory miss: the routing LLM call and a speculative vector search on the
+                # raw prompt run concurrently, the search while the decision is in flight
+                decision_future = submit_in_context(
+                    UPSTREAM_EXECUTOR,
+                    get_retriever_decision,
+                    user_prompt, 
+                    st.session_state.get("GROQ_API_KEY"),
+                    st.session_state.settings.get("groq_model", "llama3-8b-8192"),
+                    vector_store_manager=vector_store_manager
+                )
+                speculative_future = None
+                if vector_store_manager.vector_store is not None:
+                    speculative_future = CPU_EXECUTOR.submit(vector_store_manager.similarity_search, user_prompt, 4)
+
+                # Intelligent Agent Decision
                 with st.spinner("Intelligent Agent is analyzing query..."):
-                    agent_decision = get_retriever_decision(
-                        user_prompt, 
-                        st.session_state.get("GROQ_API_KEY"),
-                        st.session_state.settings.get("groq_model", "llama3-8b-8192")
-                    )
+                    agent_decision = decision_future.result()
+                log_routing(agent_decision.get("router", "llm"))
                 
                 # Clarification Logic
                 if agent_decision.get("clarification_needed", False):
@@ -248,13 +293,15 @@ def render_page():
                          agent_decision["reasoning"] += " (Forced Direct LLM due to high confidence in Chat History context)"
                     
                 with st.expander("Agent Reasoning & Strategy", expanded=True):
-                    st.write(f"**Strategy:** {agent_decision['strategy']}")
+                    st.write(f"**Strategy:** {agent_decision['strategy']} ({ROUTER_LABELS.get(agent_decision.get('router'), 'LLM router')})")
                     st.write(f"**Context:** {agent_decision.get('context_source', 'Unknown')} (Confidence: {agent_decision.get('confidence_score', 0)}/10)")
                     st.write(f"**Reasoning:** {agent_decision['reasoning']}")
                     st.write(f"**Refined Query:** {agent_decision['refined_query']}")
 
 
                 context_text = ""
+                context_header = ""
+                context_chunks = []
                 sources = []
                 
                 # Use Constants for Strategy Logic
@@ -265,15 +312,28 @@ def render_page():
                 
                 if is_retrieval_needed and st.session_state.vector_store_manager.vector_store is not None:
                     with st.spinner("Searching Vector Database..."):
-                        docs = st.session_state.vector_store_manager.similarity_search(agent_decision['refined_query'], k=4)
+                        # Reuse the speculative search unless the router rewrote the query
+                        if speculative_future is not None and agent_decision['refined_query'] == user_prompt:
+                            docs = speculative_future.result()
+                        else:
+                            docs = vector_store_manager.similarity_search(agent_decision['refined_query'], k=4)
                         if docs:
-                            context_text += "\n\n**Retrieved Documents:**\n"
+                            context_header = "Context:\n**Retrieved Documents:**\n"
                             for doc in docs:
                                 # Use file name as source identifier
                                 src_name = doc.metadata.get('source', 'Unknown Doc')
                                 page_num = doc.metadata.get('page', 'Unknown')
-                                context_text += f"--Source: {src_name} (Page {page_num})--\n{doc.page_content}\n"
+                                context_chunks.append(f"--Source: {src_name} (Page {page_num})--\n{doc.page_content}")
                                 sources.append(doc)
+                            context_text = "\n\n**Retrieved Documents:**\n" + "\n".join(context_chunks)
+
+                elif is_web_search and get_breaker("tavily").is_open():
+                    # Tavily is failing; answer from the model's own knowledge rather than wait on it
+                    st.warning("Web search is temporarily unavailable, answering without it.")
+
+                elif is_web_search and not has_time_for("web_search"):
+                    # Routing used up most of the turn's budget; keep the rest for the answer
+                    st.warning("Skipping web search to answer in time.")
 
                 elif is_web_search:
                      with st.spinner("Searching the Web (Tavily)..."):
@@ -295,13 +355,23 @@ def render_page():
                         if "Error" in web_context:
                             st.error(web_context)
                         else:
-                            context_text += f"\n\n**Web Search Results:**\n{web_context}\n"
+                            # Send only the passages most relevant to the query, not every full result
+                            web_context, web_stats = build_web_context(
+                                agent_decision['refined_query'], web_results, vector_store_manager.get_embeddings()
+                            )
+                            context_header = "Context:\n**Web Search Results:**\n"
+                            context_chunks.append(web_context)
+                            context_text = f"\n\n**Web Search Results:**\n{web_context}\n"
                             # Add results to sources list for display/logging
                             for r in web_results:
                                 sources.append(r) # Dictionary format
                                 
                             # Display Web Results in Expander
                             with st.expander(f"Found {len(web_results)} Web Results", expanded=False):
+                                st.caption(
+                                    f"Using {web_stats['kept']} of {web_stats['passages']} passages "
+                                    f"({web_stats['tokens_out']} of {web_stats['tokens_in']} tokens)"
+                                )
                                 for r in web_results:
                                     st.markdown(f"**[{r['title']}]({r['url']})**")
                                     st.caption(r['content'][:200] + "...")
@@ -311,20 +381,19 @@ def render_page():
                 if agent_decision['strategy'] == RetrievalStrategy.DIRECT_LLM.value:
                      system_prompt = load_prompt("direct_llm_system.txt")
                 else:
-                    rag_template = load_prompt("rag_response_system.txt")
-                    system_prompt = rag_template.format(context_text=context_text)
+                    # Retrieved context is appended after the instructions by the PromptAssembler below
+                    system_prompt = load_prompt("rag_response_system.txt")
                 
                 # In-Context Learning Injection
                 # 1. Positive Reinforcement
-                similar_interaction = find_similar_interaction(user_prompt)
+                similar_interaction = positive_future.result()
                 if similar_interaction:
                     st.success("💡 Learned from similar past interaction!") # Visual Feedback
                     example_text = f"\n\nRELEVANT PAST EXAMPLE (Follow this style):\nUser: {similar_interaction['past_question']}\nAssistant: {similar_interaction['past_answer']}\n"
                     system_prompt += example_text
                 
                 # 2. Negative Avoidance
-                from utils.database import find_similar_negative_interaction
-                negative_interaction = find_similar_negative_interaction(user_prompt)
+                negative_interaction = negative_future.result()
                 if negative_interaction:
                     st.warning("🛡️ Avoiding past mistake!") # Visual Feedback
                     avoid_text = f"\n\n⛔ PREVIOUS MISTAKE (DO NOT REPEAT):\nUser: {negative_interaction['past_question']}\nAssistant: {negative_interaction['past_answer']}\n(This response was rated negatively. Avoid similar logic or style.)\n"
@@ -335,15 +404,33 @@ def render_page():
                 if custom_behavior:
                     system_prompt += f"\n\n**USER CUSTOM INSTRUCTIONS**:\n{custom_behavior}\n"
 
-                messages = [{"role": "system", "content": system_prompt}] + [
-                    {"role": m["role"], "content": m["content"]} for m in st.session_state.chat_messages if m["role"] != "system"
-                ]
-
                 provider = "Groq (Web-based)"
                 model = st.session_state.settings.get("groq_model", "llama-3.3-70b-versatile")
+
+                # Fit the prompt to the model's window: the instructions and question first, then
+                # context chunks in rank order, then history newest-first (oldest turns go first)
+                prompt_budget = get_prompt_budget(model)
+                assembler = PromptAssembler(budgets={name: prompt_budget for name in DEFAULT_BUDGETS}, total_budget=prompt_budget)
+                messages, prompt_report = assembler.assemble(
+                    system=system_prompt,
+                    message=user_prompt,
+                    context_chunks=context_chunks,
+                    history=history_turns(st.session_state.chat_messages[:-1]),
+                    context_header=context_header
+                )
+                dropped = prompt_report["dropped"]
+                if dropped["history_turns"] or dropped["context_chunks"]:
+                    st.caption(
+                        f"Prompt trimmed to fit {model}: left out {dropped['history_turns']} older turn(s) "
+                        f"and {dropped['context_chunks']} context passage(s)."
+                    )
                 
                 with st.spinner("Generating answer..."):
                     response_text = ask_groq(messages, model, st.session_state.settings.get("temperature", 0.5))
+                    if response_text.startswith("Error") and similar_interaction and get_breaker("groq").is_open():
+                        # Groq is down: the closest well-rated past answer is better than an error
+                        st.warning("The model is temporarily unavailable; showing the answer to a similar past question.")
+                        response_text = similar_interaction['past_answer']
                     st.markdown(response_text)
 
                 # Log Interaction
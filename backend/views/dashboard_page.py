@@ -29,6 +29,12 @@ def render_page():
         avg = round(total_msg / total_conv, 1) if total_conv > 0 else 0
         m3.metric("Avg. Messages / Chat", avg)
 
+        # Share of turns routed locally, without the LLM routing call
+        local_routes = st.session_state.get("router_local_count", 0)
+        total_routes = local_routes + st.session_state.get("router_llm_count", 0)
+        fast_path = f"{local_routes / total_routes:.0%}" if total_routes > 0 else "-"
+        st.metric("Router Fast Path", fast_path, help="Turns routed by cached decisions or local signals instead of the LLM router")
+
     st.markdown("") # Spacing
 
     # Charts Section